@@ -2,21 +2,47 @@
 Machine Shop Suite - 3D Printing Quote Engine
 Open source quote calculator for 3D printing services
 """
-from flask import Flask, render_template, request, jsonify, abort
-from werkzeug.utils import secure_filename
+from flask import Flask, Request, render_template, request, jsonify, abort
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
 import os
+import atexit
+import gzip
+import hashlib
 import tempfile
 import logging
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
 from logging.handlers import RotatingFileHandler
 from quotes_store import QuotesStore
-from security import sign_quote, verify_quote
+from slice_cache import SliceCache
+from security import content_hash, sign_quote, verify_quote
 from config import config
-from utils import allowed_file, convert_stl_to_gcode, extract_filament_usage
+from utils import allowed_file, slice_and_analyze
 
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
+# Quote lifetimes (seconds), read once at startup
+QUOTE_TTL_SECONDS = int(os.environ.get("QUOTE_TTL_SECONDS", "1800"))
+QUOTE_LOCK_TTL_SECONDS = int(os.environ.get("QUOTE_LOCK_TTL_SECONDS", "600"))
+
 ERR_NOT_FOUND = "No encontrado"
 
+# Upload streaming chunk size (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Pre-serialized bodies smaller than this are not worth gzipping
+PRECOMPRESS_MIN_SIZE = 1024
+
+# Max items accepted by /api/calculate-quote/batch
+MAX_BATCH_QUOTES = 100
+
+# Cap on the slicing-option combos memoized per config snapshot
+SLICE_PARAMS_CACHE_SIZE = 1024
+
 def require_admin():
     if not ADMIN_TOKEN:
         return True
@@ -30,11 +56,156 @@ def require_admin():
         if auth.lower().startswith("bearer "):
             token = auth[7:].strip()
     return token == ADMIN_TOKEN
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson: parses and serializes in one C call"""
+
+    # Like the stdlib encoder, accept int/float/bool/None dict keys
+    base_option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        option = self.base_option | (orjson.OPT_INDENT_2 if kwargs.get("indent") else 0)
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        # orjson.JSONDecodeError is a ValueError, so request.get_json() still 400s
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.base_option
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        # orjson already returns UTF-8 bytes, no str round-trip needed
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype,
+        )
+
+
+class HashingUploadFile:
+    """
+    Temp file that multipart STL parts are parsed straight into, hashing the
+    bytes on the way in. The slicer reads it by name, so the upload hits the
+    disk once instead of being spooled by Werkzeug and copied again.
+    Deleted when closed (Werkzeug closes request files at teardown).
+    """
+
+    def __init__(self, directory):
+        self.file = tempfile.NamedTemporaryFile(suffix='.stl', prefix='slice_', dir=directory)
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    """
+    Request class that parses /api/slice file parts into a HashingUploadFile
+    and takes the body size cap from the live config instead of a value
+    frozen into app.config at startup.
+    """
+
+    @property
+    def max_content_length(self):
+        return SNAP.max_upload_bytes
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == 'analyze_stl':
+            return HashingUploadFile(app.config['UPLOAD_FOLDER'])
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.json = OrjsonProvider(app)
 quotes_store = QuotesStore()
-app.config['MAX_CONTENT_LENGTH'] = config.get('file_settings', 'max_file_size_mb', default=100) * 1024 * 1024
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+slice_cache = SliceCache()
+# Slice temp files; point UPLOAD_DIR at a tmpfs (e.g. /dev/shm/uploads) to keep them off disk
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_DIR') or tempfile.gettempdir()
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+
+
+def _prebuilt_json(payload):
+    """
+    Serialize a response body once, plus its gzip encoding when it is big
+    enough to be worth it; returns (body, etag, gzipped body or None)
+    """
+    body = orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE)
+    gzipped = None
+    if len(body) >= PRECOMPRESS_MIN_SIZE:
+        # mtime=0: same body => same bytes, so the gzip ETag stays stable
+        gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+    return body, hashlib.blake2b(body, digest_size=16).hexdigest(), gzipped
+
+
+def _build_snapshot(source=config):
+    """
+    Config snapshot plus the pre-serialized bodies of the read-only config
+    endpoints, which only change when the config does.
+    """
+    snap = source.snapshot()
+    snap.config_json = _prebuilt_json({
+        'success': True,
+        'config': {
+            'materials': snap.materials,
+            'print_qualities': snap.qualities,
+            'infill_options': snap.infill_options,
+            'pricing': snap.pricing,
+            'printers': snap.enabled_printers,
+            'post_processing': snap.enabled_post_processing
+        }
+    })
+    snap.materials_json = _prebuilt_json({'success': True, 'materials': snap.materials})
+    snap.max_upload_bytes = snap.max_file_size_mb * 1024 * 1024
+    # Memo of (material, quality, printer) combos already validated against
+    # this snapshot; it is replaced together with the snapshot, so a request
+    # still running on an old one can never repopulate the new one
+    snap.valid_quote_options = set()
+    # Same for the slicer parameters built from each SliceRequest
+    snap.slice_params = {}
+    return snap
+
+
+# Flattened view of the config read by request handlers (see Config.snapshot).
+# Never mutated: handlers take `snap = SNAP` once and read it without locks.
+SNAP = _build_snapshot()
+_settings_lock = threading.Lock()
+
+
+def update_settings(new_settings):
+    """
+    Copy-on-write settings update. The new snapshot is built from a copy of
+    the config, then persisted, and only then published by reference
+    assignment, so readers never block nor see a half-applied update and a
+    failed save leaves the running config untouched.
+    """
+    global SNAP
+    with _settings_lock:  # serializes writers only
+        new_snap = _build_snapshot(config.with_data(new_settings))
+        if not config.save(new_settings):
+            return False
+        config.config_data = new_settings
+        SNAP = new_snap
+    return True
+
+# Long-lived pool that runs the slicer. PrusaSlicer runs in its own child
+# process, so worker threads only wait on it; the pool caps how many slices
+# this process runs at once and queues the rest. Every gunicorn worker has
+# its own pool, so gunicorn.conf.py exports SLICER_POOL_SIZE as the CPU count
+# split across workers; run standalone, the process gets one slot per CPU.
+SLICER_POOL_SIZE = max(1, int(os.environ.get('SLICER_POOL_SIZE') or os.cpu_count() or 1))
+SLICER_POOL = ThreadPoolExecutor(max_workers=SLICER_POOL_SIZE, thread_name_prefix='slicer')
+atexit.register(SLICER_POOL.shutdown, wait=False)
 # Configure logging
 if not app.debug:
     if not os.path.exists('logs'):
@@ -49,9 +220,65 @@ if not app.debug:
     app.logger.info('Machine Shop Suite startup')
 
 
-def _is_enabled_printer(printer_key: str) -> bool:
-    p = config.get_printer(printer_key)
-    return bool(p and p.get("enabled", True))
+def _parse_int(value, field: str) -> int:
+    """
+    Parsea un entero sin montar un try/except en el caso habitual
+    (int o string de dígitos); el resto pasa por int() como antes.
+    """
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        t = value.strip()
+        if t.isdecimal():
+            return int(t)
+        if t[:1] in ("-", "+") and t[1:].isdecimal():
+            return int(t)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} debe ser un entero")
+
+
+def _parse_float(value, field: str) -> float:
+    """Parsea un número (int, float o string numérico) a float."""
+    if type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} debe ser un número")
+
+
+def _parse_key(value, field: str) -> str:
+    """Parsea una clave de config (material, calidad...) a minúsculas."""
+    if not isinstance(value, str):
+        raise ValueError(f"{field} debe ser un texto")
+    return value.lower()
+
+
+def _check_quote_options(snap, material: str, quality: str, printer: str) -> bool:
+    """
+    Comprueba material/calidad/impresora contra la config del snapshot.
+    Solo hay unas pocas combinaciones válidas, así que se memoizan en el propio
+    snapshot (snap.valid_quote_options); los errores no se cachean.
+    """
+    key = (material, quality, printer)
+    if key in snap.valid_quote_options:
+        return True
+
+    if not material or not snap.materials.get(material):
+        raise ValueError(f"material inválido: {material or '(vacío)'}")
+
+    if not quality or not snap.qualities.get(quality):
+        raise ValueError(f"calidad inválida: {quality or '(vacío)'}")
+
+    # printer debe existir y estar enabled
+    if not snap.enabled_printers.get(printer):
+        raise ValueError(f"impresora inválida o deshabilitada: {printer}")
+
+    snap.valid_quote_options.add(key)
+    return True
+
 
 def validate_quote_params(params: dict) -> dict:
     """
@@ -67,32 +294,16 @@ def validate_quote_params(params: dict) -> dict:
     printer = (params.get("printer") or "prusa_mk3s").strip().lower()
 
     # qty: aceptamos qty o quantity
-    qty_raw = params.get("qty", params.get("quantity", 1))
-    try:
-        qty = int(qty_raw)
-    except Exception:
-        raise ValueError("qty debe ser un entero")
+    qty = _parse_int(params.get("qty", params.get("quantity", 1)), "qty")
     if qty < 1:
         raise ValueError("qty debe ser >= 1")
 
     # infill_density opcional
-    infill_raw = params.get("infill_density", 20)
-    try:
-        infill_density = int(infill_raw)
-    except Exception:
-        raise ValueError("infill_density debe ser un entero")
+    infill_density = _parse_int(params.get("infill_density", 20), "infill_density")
     if infill_density < 5 or infill_density > 100:
         raise ValueError("infill_density debe estar entre 5 y 100")
 
-    if not material or not config.get_material(material):
-        raise ValueError(f"material inválido: {material or '(vacío)'}")
-
-    if not quality or not config.get("print_quality", quality):
-        raise ValueError(f"calidad inválida: {quality or '(vacío)'}")
-
-    # printer debe existir y estar enabled
-    if not config.get_printer(printer) or not _is_enabled_printer(printer):
-        raise ValueError(f"impresora inválida o deshabilitada: {printer}")
+    _check_quote_options(SNAP, material, quality, printer)
 
     # devuelve params normalizados
     return {
@@ -108,19 +319,58 @@ def validate_quote_params(params: dict) -> dict:
 # ROUTES
 # ============================================================================
 
+@dataclass(slots=True)
+class QuoteRequest:
+    """
+    Cuerpo de /api/calculate-quote, parseado y tipado en una sola pasada.
+    Un tipo incorrecto lanza ValueError (400) en vez de acabar en un 500.
+    """
+    material: str = 'pla'
+    quality: str = 'standard'
+    printer: str = 'prusa_mk3s'
+    infill_density: int = 20
+    quantity: int = 1
+    filament_weight_g: float = 0.0
+    print_time_hours: float = 0.0
+    post_processing: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data) -> "QuoteRequest":
+        if not isinstance(data, dict):
+            raise ValueError("el cuerpo debe ser un objeto JSON")
+
+        # Optional post-processing: una clave suelta o una lista
+        post_processing = data.get('post_processing', [])
+        if isinstance(post_processing, str):
+            post_processing = [post_processing] if post_processing else []
+        elif not isinstance(post_processing, list):
+            raise ValueError("post_processing debe ser una lista")
+        elif not all(isinstance(k, str) for k in post_processing):
+            raise ValueError("post_processing debe ser una lista de claves")
+
+        return cls(
+            material=_parse_key(data.get('material', 'pla'), 'material'),
+            quality=_parse_key(data.get('quality', 'standard'), 'quality'),
+            printer=_parse_key(data.get('printer', 'prusa_mk3s'), 'printer'),
+            infill_density=_parse_int(data.get('infill_density', 20), 'infill_density'),
+            quantity=_parse_int(data.get('quantity', 1), 'quantity'),
+            filament_weight_g=_parse_float(data.get('filament_weight_g', 0), 'filament_weight_g'),
+            print_time_hours=_parse_float(data.get('print_time_hours', 0), 'print_time_hours'),
+            post_processing=post_processing,
+        )
+
+
 @app.route('/')
 def index():
     """Main quote engine page"""
-    materials = config.get_materials()
-    qualities = config.get_print_qualities()
-    infill_options = config.get('infill_options')
-    printers = config.get_enabled_printers()
-
+    # Rendered per request: base.html reads request.args (admin token in the
+    # settings link) and request.path, so the HTML must never be shared
+    snap = SNAP
     return render_template('index.html',
-                         materials=materials,
-                         qualities=qualities,
-                         infill_options=infill_options,
-                         printers=printers)
+                           materials=snap.materials,
+                           qualities=snap.qualities,
+                           infill_options=snap.infill_options,
+                           printers=snap.enabled_printers)
 
 @app.errorhandler(401)
 def unauthorized(_):
@@ -138,21 +388,37 @@ def settings_page():
 # API ENDPOINTS
 # ============================================================================
 
+def _prebuilt_response(prebuilt):
+    """
+    Serve a pre-serialized body, gzipped if the client accepts it;
+    304 if the client's ETag matches
+    """
+    body, etag, gzipped = prebuilt
+    encoding = None
+    if gzipped is not None and request.accept_encodings['gzip']:
+        body, encoding = gzipped, 'gzip'
+        # Each encoding is a different representation, so it gets its own ETag
+        etag += '-gz'
+
+    if request.if_none_match.contains_weak(etag):
+        # Revalidation of an unchanged config (the usual poll): no body at all
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        if encoding is not None:
+            response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate (cheap 304) before reuse
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Get current configuration (for frontend)"""
     try:
-        return jsonify({
-            'success': True,
-            'config': {
-                'materials': config.get_materials(),
-                'print_qualities': config.get_print_qualities(),
-                'infill_options': config.get('infill_options'),
-                'pricing': config.get_pricing_config(),
-                'printers': config.get_enabled_printers(),
-                'post_processing': config.get_enabled_post_processing()
-            }
-        })
+        return _prebuilt_response(SNAP.config_json)
     except Exception as e:
         app.logger.error(f"Error getting config: {str(e)}")
         return jsonify({'success': False, 'error': 'No se pudo cargar la configuración'}), 500
@@ -162,97 +428,155 @@ def get_config():
 def get_materials():
     """Get all available materials"""
     try:
-        materials = config.get_materials()
-        return jsonify({'success': True, 'materials': materials})
+        return _prebuilt_response(SNAP.materials_json)
     except Exception as e:
         app.logger.error(f"Error getting materials: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/slice', methods=['POST'])
-def analyze_stl():
+@dataclass(slots=True, frozen=True)
+class SliceRequest:
     """
-    Analyze STL file and calculate print requirements
-    Returns filament usage and estimated time
+    Opciones de laminado de /api/slice y /api/slice-stream, parseadas y
+    tipadas en una sola pasada (sea cual sea su origen: form, query o cabeceras).
     """
-    # Validate file upload
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': 'No se subió ningún archivo'}), 400
-
-    file = request.files['file']
-    if not file or file.filename == '':
-        return jsonify({'success': False, 'error': 'No se seleccionó ningún archivo'}), 400
+    material: str = 'pla'
+    quality: str = 'standard'
+    printer: str = 'prusa_mk3s'
+    infill_density: int = 20
+    support: bool = False
+
+    @classmethod
+    def from_source(cls, get) -> "SliceRequest":
+        """`get(name, default)` devuelve el valor (string) de cada opción."""
+        try:
+            infill_density = max(5, min(100, _parse_int(get('infill_density', '20'), 'infill_density')))
+        except ValueError:
+            raise ValueError('Densidad de relleno no válida')
+        return cls(
+            material=get('material', 'pla').lower(),
+            quality=get('quality', 'standard').lower(),
+            printer=get('printer', 'prusa_mk3s').lower(),
+            infill_density=infill_density,
+            support=get('support', 'false').lower() == 'true',
+        )
+
+
+def _build_slice_params(snap, req):
+    """
+    Validate slicing options and build the parameters for the slicer.
+    Pure function of the options and the snapshot, so it is memoized on the
+    snapshot (up to SLICE_PARAMS_CACHE_SIZE entries); the returned dict must
+    not be mutated.
 
-    if not allowed_file(file.filename):
-        return jsonify({'success': False, 'error': 'Tipo de archivo no válido. Solo se permiten archivos STL.'}), 400
+    Returns:
+        tuple: (params: dict or None, error_message: str or None)
+    """
+    result = snap.slice_params.get(req)
+    if result is None:
+        result = _slice_params_for(snap, req)
+        if len(snap.slice_params) < SLICE_PARAMS_CACHE_SIZE:
+            snap.slice_params[req] = result
+    return result
 
-    # Get parameters
-    material = request.form.get('material', 'pla').lower()
-    quality = request.form.get('quality', 'standard').lower()
-    infill_density = request.form.get('infill_density', '20')
-    support = request.form.get('support', 'false').lower() == 'true'
-    printer = request.form.get('printer', 'prusa_mk3s').lower()
 
+def _slice_params_for(snap, req):
     # Validate material
-    material_config = config.get_material(material)
+    material_config = snap.materials.get(req.material)
     if not material_config:
-        return jsonify({'success': False, 'error': f'Material inválido: {material}'}), 400
+        return None, f'Material inválido: {req.material}'
 
     # Validate quality
-    quality_config = config.get('print_quality', quality)
+    quality_config = snap.qualities.get(req.quality)
     if not quality_config:
-        return jsonify({'success': False, 'error': f'Calidad inválida: {quality}'}), 400
+        return None, f'Calidad inválida: {req.quality}'
 
     # Validate printer
-    printer_config = config.get_printer(printer)
-    if not printer_config:
-        return jsonify({'success': False, 'error': f'Impresora inválida: {printer}'}), 400
+    if not snap.printers.get(req.printer):
+        return None, f'Impresora inválida: {req.printer}'
 
-    # Validate infill
-    try:
-        infill_density = max(5, min(100, int(infill_density)))
-    except ValueError:
-        return jsonify({'success': False, 'error': 'Densidad de relleno no válida'}), 400
-
-    # Prepare slicing parameters
-    params = {
+    return {
         'layer_height': quality_config.get('layer_height', 0.2),
-        'infill_density': infill_density,
+        'infill_density': req.infill_density,
         'bed_temp': material_config.get('bed_temp', 60),
         'extruder_temp': material_config.get('extruder_temp', 210),
         'perimeter_speed': material_config.get('perimeter_speed', 60),
         'infill_speed': material_config.get('infill_speed', 80),
         'solid_infill_speed': material_config.get('solid_infill_speed', 60),
-        'support': support
-    }
+        'support': req.support
+    }, None
 
-    input_path = None
-    output_path = None
 
-    try:
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{os.getpid()}_{filename}")
-        output_filename = os.path.splitext(filename)[0] + ".gcode"
-        output_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{os.getpid()}_{output_filename}")
+def _reject_oversized_upload():
+    """
+    413 straight from the Content-Length header, before any of the body is
+    read or parsed. Chunked uploads (no header) are capped while copying.
+    """
+    if request.content_length is not None and request.content_length > SNAP.max_upload_bytes:
+        abort(413)
 
-        file.save(input_path)
-        app.logger.info(f"Processing STL file: {filename}")
 
-        # Convert STL to G-code
-        slicer_path = config.get_slicer_path()
-        success, error = convert_stl_to_gcode(input_path, output_path, params, slicer_path)
+def _copy_upload(stream, dest):
+    """
+    Copy an upload stream to disk (path or open fd) in fixed-size chunks,
+    never holding the whole body in memory. Aborts with 413 once the size
+    cap is exceeded.
 
-        if not success:
+    Returns:
+        tuple: (bytes_written: int, sha256_hexdigest: str)
+    """
+    max_bytes = SNAP.max_upload_bytes
+    written = 0
+    # hashlib.sha256 is OpenSSL's, which uses SHA-NI / ARMv8 SHA2 when present
+    digest = hashlib.sha256()
+    # Reuse one buffer instead of allocating a new bytes object per chunk
+    buf = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buf)
+    # Unbuffered: each chunk goes to disk in a single write(2), no extra copy
+    with open(dest, 'wb', buffering=0) as f:
+        while n := stream.readinto(buf):
+            written += n
+            if written > max_bytes:
+                abort(413)
+            chunk = view[:n]
+            digest.update(chunk)
+            while chunk:
+                chunk = chunk[f.write(chunk):]
+    return written, digest.hexdigest()
+
+
+def _slice_file(input_path, stl_digest, filename, params):
+    """
+    Slice an STL already on disk and extract filament usage, going through
+    the slice cache. Shared by the multipart and raw-body slice endpoints.
+    """
+    try:
+        # Same STL + same params => same result, skip the slicer
+        snap = SNAP
+        slicer_path = snap.slicer_path
+        cache_key = slice_cache.key(stl_digest, {**params, 'slicer_path': slicer_path})
+        filament_info = slice_cache.get(cache_key)
+        if filament_info is not None:
+            app.logger.info(f"Slice cache hit: {filename!r}")
+            return jsonify({'success': True, 'data': filament_info})
+
+        app.logger.info(f"Processing STL file: {filename!r}")
+
+        # Slice and extract filament usage/time on the slicer pool
+        timeout = snap.slicer_timeout
+        future = SLICER_POOL.submit(slice_and_analyze, input_path, params, slicer_path, timeout)
+        filament_info, error = future.result()
+
+        if error:
             app.logger.error(f"Slicing failed: {error}")
             return jsonify({'success': False, 'error': error}), 500
 
-        # Extract filament usage and time
-        filament_info = extract_filament_usage(output_path)
-
-        if 'error' in filament_info:
-            app.logger.error(f"Failed to extract filament info: {filament_info['error']}")
-            return jsonify({'success': False, 'error': filament_info['error']}), 500
+        # Fallback estimates (with 'warning') are not worth caching
+        if 'warning' not in filament_info:
+            try:
+                slice_cache.set(cache_key, filament_info)
+            except Exception as e:
+                app.logger.warning(f"Failed to cache slice result: {str(e)}")
 
         return jsonify({
             'success': True,
@@ -263,219 +587,334 @@ def analyze_stl():
         app.logger.error(f"Error processing STL: {str(e)}")
         return jsonify({'success': False, 'error': f'El procesamiento falló: {str(e)}'}), 500
 
-    finally:
-        # Clean up temporary files
-        for path in [input_path, output_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception as e:
-                    app.logger.warning(f"Failed to delete temp file {path}: {str(e)}")
+
+def _slice_upload(stream, filename, params):
+    """
+    Stream a raw-body STL upload (/api/slice-stream) to a temp file, then
+    slice it (see _slice_file).
+    """
+    try:
+        # Per-request directory: removed with everything in it on exit
+        with tempfile.TemporaryDirectory(prefix='slice_', dir=app.config['UPLOAD_FOLDER'],
+                                         ignore_cleanup_errors=True) as tmp_dir:
+            input_path = os.path.join(tmp_dir, 'model.stl')
+            written, stl_digest = _copy_upload(stream, input_path)
+            if not written:
+                return jsonify({'success': False, 'error': 'No se subió ningún archivo'}), 400
+
+            return _slice_file(input_path, stl_digest, filename, params)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error processing STL: {str(e)}")
+        return jsonify({'success': False, 'error': f'El procesamiento falló: {str(e)}'}), 500
 
 
-@app.route('/api/calculate-quote', methods=['POST'])
-def calculate_quote():
+@app.route('/api/slice', methods=['POST'])
+def analyze_stl():
     """
-    Calculate complete quote with pricing breakdown
+    Analyze STL file and calculate print requirements
+    Returns filament usage and estimated time
     """
+    _reject_oversized_upload()
+
+    # Validate file upload
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'No se subió ningún archivo'}), 400
+
+    file = request.files['file']
+    if not file or file.filename == '':
+        return jsonify({'success': False, 'error': 'No se seleccionó ningún archivo'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'success': False, 'error': 'Tipo de archivo no válido. Solo se permiten archivos STL.'}), 400
+
     try:
-        data = request.get_json()
-
-        # Extract parameters
-        material = data.get('material', 'pla').lower()
-        quality = data.get('quality', 'standard').lower()
-        printer = data.get('printer', 'prusa_mk3s').lower()
-        infill_density = int(data.get('infill_density', 20))
-        quantity = int(data.get('quantity', 1))
-        filament_weight_g = float(data.get('filament_weight_g', 0))
-        print_time_hours = float(data.get('print_time_hours', 0))
-
-        # Optional post-processing
-        post_processing_keys = data.get('post_processing', [])
-        if isinstance(post_processing_keys, str):
-            post_processing_keys = [post_processing_keys] if post_processing_keys else []
-
-        # Get configuration
-        material_config = config.get_material(material)
-        printer_config = config.get_printer(printer)
-        pricing_config = config.get_pricing_config()
-        pricing_mode = config.get_pricing_mode()
-
-        if not material_config:
-            return jsonify({'success': False, 'error': 'Material inválido'}), 400
-        if not printer_config:
-            return jsonify({'success': False, 'error': 'Impresora inválida'}), 400
-
-        # Currency
-        currency = pricing_config.get('currency', 'EUR')
-        currency_symbol = pricing_config.get('currency_symbol', '€')
-        gst_rate = pricing_config.get('gst_rate', 0.18)
-
-        # Check pricing mode
-        if pricing_mode == 'per_gram':
-            # Simple per-gram pricing
-            per_gram_price = material_config.get('per_gram_price', 1.0)
-            material_cost = filament_weight_g * per_gram_price
-
-            # Post-processing costs (per unit)
-            post_processing_cost_per_unit = 0
-            post_processing_details = []
-
-            for pp_key in post_processing_keys:
-                pp_option = config.get_post_processing(pp_key)
-                if pp_option and pp_option.get('enabled', True):
-                    pp_price = pp_option.get('price', 0)
-                    post_processing_cost_per_unit += pp_price
-                    post_processing_details.append({
-                        'key': pp_key,
-                        'name': pp_option.get('name', pp_key),
-                        'price': pp_price
-                    })
-
-            # Simple calculation: material_cost + post_processing per unit
-            subtotal_per_unit = material_cost
-
-            # Total before tax
-            total_before_tax = (subtotal_per_unit * quantity) + (post_processing_cost_per_unit * quantity)
-
-            # GST calculation
-            gst_amount = total_before_tax * gst_rate
-
-            # Final total
-            total_price = total_before_tax + gst_amount
-
-            # Return simplified breakdown for per-gram pricing
-            return jsonify({
-                'success': True,
-                'quote': {
-                    'breakdown': {
-                        'pricing_mode': 'per_gram',
-                        'per_gram_price': round(per_gram_price, 2),
-                        'filament_weight_g': filament_weight_g,
-                        'material_cost_per_unit': round(material_cost, 2),
-                        'subtotal_per_unit': round(subtotal_per_unit, 2),
-                        'quantity': quantity,
-                        'subtotal_all_units': round(subtotal_per_unit * quantity, 2),
-                        'post_processing_cost_per_unit': round(post_processing_cost_per_unit, 2),
-                        'post_processing_cost_total': round(post_processing_cost_per_unit * quantity, 2),
-                        'post_processing_details': post_processing_details,
-                        'total_before_tax': round(total_before_tax, 2),
-                        'gst_rate_percent': round(gst_rate * 100, 2),
-                        'gst_amount': round(gst_amount, 2),
-                        'total_price': round(total_price, 2)
-                    },
-                    'currency': currency,
-                    'currency_symbol': currency_symbol,
-                    'print_details': {
-                        'material': material,
-                        'material_name': material_config.get('name', material.upper()),
-                        'printer': printer,
-                        'printer_name': printer_config.get('name', printer.upper()),
-                        'quality': quality,
-                        'infill_density': infill_density,
-                        'filament_weight_g': filament_weight_g,
-                        'print_time_hours': print_time_hours,
-                        'quantity': quantity
-                    }
-                }
-            })
+        params, error = _build_slice_params(SNAP, SliceRequest.from_source(request.form.get))
+    except ValueError as ve:
+        params, error = None, str(ve)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
 
-        # Custom pricing mode (original complex logic)
-        # Calculate costs
-        # 1. Material cost
-        material_price_per_kg = material_config.get('price_per_kg', 1000)
-        material_cost = (filament_weight_g / 1000) * material_price_per_kg
+    # Already parsed to disk and hashed by UploadRequest: no second copy
+    upload = file.stream
+    if not upload.size:
+        return jsonify({'success': False, 'error': 'No se subió ningún archivo'}), 400
+    upload.flush()
+    return _slice_file(upload.name, upload.digest.hexdigest(), file.filename, params)
 
-        # 2. Electricity cost
-        electricity_rate = pricing_config.get('electricity_rate_per_kwh', 7)
-        printer_power_kw = pricing_config.get('printer_power_watts', 1000) / 1000
-        electricity_cost = printer_power_kw * print_time_hours * electricity_rate
 
-        # 3. Depreciation cost (machine wear and tear)
-        depreciation_cost = pricing_config.get('depreciation_per_hour', 50) * print_time_hours
+# Header fallback for each /api/slice-stream query option
+SLICE_OPTION_HEADERS = {
+    'filename': 'X-Filename',
+    'material': 'X-Material',
+    'quality': 'X-Quality',
+    'infill_density': 'X-Infill-Density',
+    'support': 'X-Support',
+    'printer': 'X-Printer',
+}
 
-        # 4. Other operational costs
-        other_costs = pricing_config.get('other_costs_per_print', 20)
 
-        # 5. Base cost (setup, handling, etc.)
-        base_cost = pricing_config.get('base_cost', 150)
+@app.route('/api/slice-stream', methods=['POST'])
+def slice_stream():
+    """
+    Analyze an STL sent as the raw request body (application/octet-stream).
+    Options come from the query string or X-* headers instead of form fields,
+    so the body is copied straight to disk without multipart parsing.
+    """
+    _reject_oversized_upload()
 
-        # Cost before markup
-        cost_before_markup = material_cost + electricity_cost + depreciation_cost + other_costs + base_cost
+    def option(name, default):
+        return request.args.get(name) or request.headers.get(SLICE_OPTION_HEADERS[name]) or default
 
-        # 6. Apply printer-specific markup
-        markup_multiplier = printer_config.get('markup_multiplier', 1.3)
-        subtotal_per_unit = cost_before_markup * markup_multiplier
+    filename = option('filename', 'upload.stl')
+    if not allowed_file(filename):
+        return jsonify({'success': False, 'error': 'Tipo de archivo no válido. Solo se permiten archivos STL.'}), 400
 
-        # Post-processing costs (per unit)
-        post_processing_cost_per_unit = 0
-        post_processing_details = []
+    try:
+        params, error = _build_slice_params(SNAP, SliceRequest.from_source(option))
+    except ValueError as ve:
+        params, error = None, str(ve)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
 
-        for pp_key in post_processing_keys:
-            pp_option = config.get_post_processing(pp_key)
-            if pp_option and pp_option.get('enabled', True):
-                pp_price = pp_option.get('price', 0)
-                post_processing_cost_per_unit += pp_price
-                post_processing_details.append({
-                    'key': pp_key,
-                    'name': pp_option.get('name', pp_key),
-                    'price': pp_price
-                })
+    return _slice_upload(request.stream, filename, params)
 
-        # Total before tax
-        total_before_tax = (subtotal_per_unit * quantity) + (post_processing_cost_per_unit * quantity)
 
-        # GST calculation
-        gst_amount = total_before_tax * gst_rate
+# Money fields of each breakdown, rounded to 2 decimals in a single pass
+PER_GRAM_ROUNDED_FIELDS = (
+    'per_gram_price', 'material_cost_per_unit', 'subtotal_per_unit', 'subtotal_all_units',
+    'post_processing_cost_per_unit', 'post_processing_cost_total',
+    'total_before_tax', 'gst_rate_percent', 'gst_amount', 'total_price',
+)
+CUSTOM_ROUNDED_FIELDS = (
+    'material_cost_per_unit', 'electricity_cost_per_unit', 'depreciation_cost_per_unit',
+    'other_costs_per_unit', 'base_cost_per_unit', 'cost_before_markup', 'subtotal_per_unit',
+    'subtotal_all_units', 'post_processing_cost_per_unit', 'post_processing_cost_total',
+    'total_before_tax', 'gst_rate_percent', 'gst_amount', 'total_price',
+)
 
-        # Final total
-        total_price = total_before_tax + gst_amount
 
-        # Return custom pricing breakdown
-        return jsonify({
-            'success': True,
-            'quote': {
-                'breakdown': {
-                    'pricing_mode': 'custom',
-                    'material_cost_per_unit': round(material_cost, 2),
-                    'electricity_cost_per_unit': round(electricity_cost, 2),
-                    'depreciation_cost_per_unit': round(depreciation_cost, 2),
-                    'other_costs_per_unit': round(other_costs, 2),
-                    'base_cost_per_unit': round(base_cost, 2),
-                    'cost_before_markup': round(cost_before_markup, 2),
-                    'markup_multiplier': markup_multiplier,
-                    'subtotal_per_unit': round(subtotal_per_unit, 2),
-                    'quantity': quantity,
-                    'subtotal_all_units': round(subtotal_per_unit * quantity, 2),
-                    'post_processing_cost_per_unit': round(post_processing_cost_per_unit, 2),
-                    'post_processing_cost_total': round(post_processing_cost_per_unit * quantity, 2),
-                    'post_processing_details': post_processing_details,
-                    'total_before_tax': round(total_before_tax, 2),
-                    'gst_rate_percent': round(gst_rate * 100, 2),
-                    'gst_amount': round(gst_amount, 2),
-                    'total_price': round(total_price, 2)
-                },
-                'currency': currency,
-                'currency_symbol': currency_symbol,
-                'print_details': {
-                    'material': material,
-                    'material_name': material_config.get('name', material.upper()),
-                    'printer': printer,
-                    'printer_name': printer_config.get('name', printer.upper()),
-                    'quality': quality,
-                    'infill_density': infill_density,
-                    'filament_weight_g': filament_weight_g,
-                    'print_time_hours': print_time_hours,
-                    'quantity': quantity
-                }
-            }
+def _rounded_fields(fields, values):
+    """Zip breakdown field names with their values rounded to 2 decimals"""
+    return dict(zip(fields, map(round, values, repeat(2))))
+
+
+def _price_totals(subtotal_per_unit, quantity, post_processing_cost_per_unit, gst_rate):
+    """
+    Pricing tail shared by both modes: units, post-processing and GST.
+    Returns (subtotal_all_units, post_processing_cost_total, total_before_tax, gst_amount, total_price)
+    """
+    subtotal_all_units = subtotal_per_unit * quantity
+    post_processing_cost_total = post_processing_cost_per_unit * quantity
+    total_before_tax = subtotal_all_units + post_processing_cost_total
+    gst_amount = total_before_tax * gst_rate
+    return (subtotal_all_units, post_processing_cost_total, total_before_tax,
+            gst_amount, total_before_tax + gst_amount)
+
+
+def _per_gram_price_kernel(filament_weight_g, quantity, per_gram_price,
+                           post_processing_cost_per_unit, gst_rate):
+    """
+    Pure per-gram pricing math.
+    Returns values in PER_GRAM_ROUNDED_FIELDS order.
+    """
+    # Simple calculation: material_cost + post_processing per unit
+    material_cost = filament_weight_g * per_gram_price
+    subtotal_all_units, post_processing_cost_total, total_before_tax, gst_amount, total_price = \
+        _price_totals(material_cost, quantity, post_processing_cost_per_unit, gst_rate)
+
+    return (
+        per_gram_price, material_cost, material_cost, subtotal_all_units,
+        post_processing_cost_per_unit, post_processing_cost_total,
+        total_before_tax, gst_rate * 100, gst_amount, total_price,
+    )
+
+
+def _custom_price_kernel(filament_weight_g, print_time_hours, quantity,
+                         material_price_per_kg, electricity_rate, printer_power_kw,
+                         depreciation_per_hour, other_costs, base_cost,
+                         markup_multiplier, post_processing_cost_per_unit, gst_rate):
+    """
+    Pure custom-mode pricing math.
+    Returns values in CUSTOM_ROUNDED_FIELDS order.
+    """
+    # 1. Material cost
+    material_cost = (filament_weight_g / 1000) * material_price_per_kg
+
+    # 2. Electricity cost
+    electricity_cost = printer_power_kw * print_time_hours * electricity_rate
+
+    # 3. Depreciation cost (machine wear and tear)
+    depreciation_cost = depreciation_per_hour * print_time_hours
+
+    # 4. Other operational costs + 5. Base cost (setup, handling, etc.)
+    cost_before_markup = material_cost + electricity_cost + depreciation_cost + other_costs + base_cost
+
+    # 6. Apply printer-specific markup
+    subtotal_per_unit = cost_before_markup * markup_multiplier
+    subtotal_all_units, post_processing_cost_total, total_before_tax, gst_amount, total_price = \
+        _price_totals(subtotal_per_unit, quantity, post_processing_cost_per_unit, gst_rate)
+
+    return (
+        material_cost, electricity_cost, depreciation_cost, other_costs, base_cost,
+        cost_before_markup, subtotal_per_unit, subtotal_all_units,
+        post_processing_cost_per_unit, post_processing_cost_total,
+        total_before_tax, gst_rate * 100, gst_amount, total_price,
+    )
+
+
+def _compute_quote(req, snap):
+    """
+    Price one QuoteRequest against a config snapshot.
+
+    Returns:
+        tuple: (quote: dict or None, error_message: str or None)
+    """
+    material = req.material
+    printer = req.printer
+    quantity = req.quantity
+    filament_weight_g = req.filament_weight_g
+    print_time_hours = req.print_time_hours
+
+    # Get configuration
+    material_config = snap.materials.get(material)
+    printer_config = snap.printers.get(printer)
+    pricing_config = snap.pricing
+
+    if not material_config:
+        return None, 'Material inválido'
+    if not printer_config:
+        return None, 'Impresora inválida'
+
+    # Currency
+    currency = pricing_config.get('currency', 'EUR')
+    currency_symbol = pricing_config.get('currency_symbol', '€')
+    gst_rate = pricing_config.get('gst_rate', 0.18)
+
+    # Post-processing costs (per unit), unknown/disabled keys are ignored
+    pp_table = snap.pp_table
+    selected = [(pp_key, pp_table[pp_key]) for pp_key in req.post_processing if pp_key in pp_table]
+    post_processing_cost_per_unit = sum(price for _, (_, price) in selected)
+    post_processing_details = [
+        {'key': pp_key, 'name': name, 'price': price}
+        for pp_key, (name, price) in selected
+    ]
+
+    print_details = {
+        'material': material,
+        'material_name': material_config.get('name', material.upper()),
+        'printer': printer,
+        'printer_name': printer_config.get('name', printer.upper()),
+        'quality': req.quality,
+        'infill_density': req.infill_density,
+        'filament_weight_g': filament_weight_g,
+        'print_time_hours': print_time_hours,
+        'quantity': quantity
+    }
+
+    # Check pricing mode
+    if snap.pricing_mode == 'per_gram':
+        # Simple per-gram pricing
+        breakdown = _rounded_fields(PER_GRAM_ROUNDED_FIELDS, _per_gram_price_kernel(
+            filament_weight_g, quantity,
+            material_config.get('per_gram_price', 1.0),
+            post_processing_cost_per_unit, gst_rate,
+        ))
+        breakdown.update({
+            'pricing_mode': 'per_gram',
+            'filament_weight_g': filament_weight_g,
+            'quantity': quantity,
+            'post_processing_details': post_processing_details,
         })
+    else:
+        # Custom pricing mode (original complex logic)
+        markup_multiplier = printer_config.get('markup_multiplier', 1.3)
+        breakdown = _rounded_fields(CUSTOM_ROUNDED_FIELDS, _custom_price_kernel(
+            filament_weight_g, print_time_hours, quantity,
+            material_config.get('price_per_kg', 1000),
+            pricing_config.get('electricity_rate_per_kwh', 7),
+            pricing_config.get('printer_power_watts', 1000) / 1000,
+            pricing_config.get('depreciation_per_hour', 50),
+            pricing_config.get('other_costs_per_print', 20),
+            pricing_config.get('base_cost', 150),
+            markup_multiplier, post_processing_cost_per_unit, gst_rate,
+        ))
+        breakdown.update({
+            'pricing_mode': 'custom',
+            'markup_multiplier': markup_multiplier,
+            'quantity': quantity,
+            'post_processing_details': post_processing_details,
+        })
+
+    return {
+        'breakdown': breakdown,
+        'currency': currency,
+        'currency_symbol': currency_symbol,
+        'print_details': print_details
+    }, None
+
+
+@app.route('/api/calculate-quote', methods=['POST'])
+def calculate_quote():
+    """
+    Calculate complete quote with pricing breakdown
+    """
+    try:
+        req = QuoteRequest.from_dict(orjson.loads(request.get_data()))
+
+        quote, error = _compute_quote(req, SNAP)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
 
+        return jsonify({'success': True, 'quote': quote})
+
+    except orjson.JSONDecodeError:
+        return jsonify({'success': False, 'error': 'JSON inválido'}), 400
+    except ValueError as ve:
+        return jsonify({'success': False, 'error': str(ve)}), 400
     except Exception as e:
         app.logger.error(f"Error calculating quote: {str(e)}")
         return jsonify({'success': False, 'error': f'Falló el cálculo del presupuesto: {str(e)}'}), 500
 
 
+@app.route('/api/calculate-quote/batch', methods=['POST'])
+def calculate_quote_batch():
+    """
+    Calculate several quotes (e.g. the line items of an order) in one request.
+    Body: a JSON list of calculate-quote bodies. Every item gets its own
+    result, so one invalid item does not fail the whole batch.
+    """
+    try:
+        items = orjson.loads(request.get_data())
+        if not isinstance(items, list):
+            return jsonify({'success': False, 'error': 'Se esperaba una lista de presupuestos'}), 400
+        if len(items) > MAX_BATCH_QUOTES:
+            return jsonify({'success': False, 'error': f'Máximo {MAX_BATCH_QUOTES} presupuestos por petición'}), 400
+
+        # One snapshot for the whole batch: all items see the same config
+        snap = SNAP
+        results = []
+        for item in items:
+            try:
+                quote, error = _compute_quote(QuoteRequest.from_dict(item), snap)
+            except ValueError as ve:
+                quote, error = None, str(ve)
+            if error:
+                results.append({'success': False, 'error': error})
+            else:
+                results.append({'success': True, 'quote': quote})
+
+        return jsonify({'success': True, 'quotes': results})
+
+    except orjson.JSONDecodeError:
+        return jsonify({'success': False, 'error': 'JSON inválido'}), 400
+    except Exception as e:
+        app.logger.error(f"Error calculating quote batch: {str(e)}")
+        return jsonify({'success': False, 'error': f'Falló el cálculo del presupuesto: {str(e)}'}), 500
+
+
 @app.route('/api/settings', methods=['GET', 'POST'])
 def manage_settings():
     """
@@ -499,11 +938,8 @@ def manage_settings():
         try:
             new_settings = request.get_json()
 
-            # Update configuration
-            config.config_data = new_settings
-
-            # Save to file
-            if config.save():
+            # Save to file and publish the new configuration
+            if update_settings(new_settings):
                 app.logger.info("Settings updated successfully")
                 return jsonify({'success': True, 'message': 'Ajustes actualizados correctamente'})
             else:
@@ -513,6 +949,16 @@ def manage_settings():
             app.logger.error(f"Error updating settings: {str(e)}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+def _sign(quote):
+    """
+    Firma el quote. contentHash (params + computed) solo se calcula si falta:
+    quien cambie params o computed debe hacer quote.pop("contentHash", None).
+    """
+    if "contentHash" not in quote:
+        quote["contentHash"] = content_hash(quote)
+    quote["signature"] = sign_quote(quote)
+
+
 @app.route("/api/quotes", methods=["POST"])
 def create_quote():
     try:
@@ -526,22 +972,21 @@ def create_quote():
 
         quote_id = quotes_store.new_id()
         now = quotes_store.now()
-        ttl = int(os.environ.get("QUOTE_TTL_SECONDS", "1800"))
-        expires_at = now + ttl
+        expires_at = now + QUOTE_TTL_SECONDS
 
         quote = {
             "quoteId": quote_id,
             "status": "estimated",
             "createdAtTs": now,
             "expiresAtTs": expires_at,
-            "configVersion": config.get_config_version(),
+            "configVersion": SNAP.config_version,
             "params": params,
             "computed": computed,
             "price": computed.get("price") or computed.get("total_price") or computed.get("totalPrice"),
             "currency": computed.get("currency") or computed.get("currency_symbol") or "EUR",
         }
 
-        quote["signature"] = sign_quote(quote)
+        _sign(quote)
 
         quotes_store.save(quote_id, quote)
         return jsonify({"success": True, "quote": quote}), 201
@@ -551,6 +996,21 @@ def create_quote():
     except Exception as e:
         app.logger.error(f"Error creating quote: {str(e)}")
         return jsonify({"success": False, "error": "No se pudo crear el presupuesto"}), 500
+
+
+# Campos de cada quote en el listado -> valor si el quote no lo tiene
+# (solo se serializan, nunca se mutan)
+QUOTE_LIST_FIELDS = {
+    "quoteId": None,
+    "status": None,
+    "createdAtTs": None,
+    "expiresAtTs": None,
+    "price": None,
+    "currency": "EUR",
+    "params": {},
+}
+
+
 @app.route("/api/quotes", methods=["GET"])
 def list_quotes():
     if not require_admin():
@@ -565,26 +1025,13 @@ def list_quotes():
         status = request.args.get("status")  # opcional
         q = (request.args.get("q") or "").strip().lower()  # opcional
 
-        # si tu QuotesStore todavía no tiene list(), lo implementamos después
-        items = quotes_store.list(limit=limit, cursor=cursor, status=status, q=q)
-
-        # listado "lite" (no devuelvas computed completo por defecto)
-        lite = []
-        for it in items.get("items", []):
-            lite.append({
-                "quoteId": it.get("quoteId"),
-                "status": it.get("status"),
-                "createdAtTs": it.get("createdAtTs"),
-                "expiresAtTs": it.get("expiresAtTs"),
-                "price": it.get("price"),
-                "currency": it.get("currency", "EUR"),
-                "params": it.get("params", {}),
-            })
+        # listado "lite": el store filtra y proyecta (sin computed)
+        page = quotes_store.list(limit=limit, cursor=cursor, status=status, q=q, fields=QUOTE_LIST_FIELDS)
 
         return jsonify({
             "success": True,
-            "items": lite,
-            "nextCursor": items.get("nextCursor"),
+            "items": page["items"],
+            "nextCursor": page["nextCursor"],
         })
 
     except Exception as e:
@@ -600,7 +1047,7 @@ def get_quote(quote_id: str):
     # expira
     if quotes_store.is_expired(quote):
         quote["status"] = "expired"
-        quote["signature"] = sign_quote(quote)
+        _sign(quote)
         quotes_store.save(quote_id, quote)
 
     return jsonify({"success": True, "quote": quote})
@@ -624,29 +1071,33 @@ def refresh_quote(quote_id: str):
 
     # Revalida params por si el storage tenía algo viejo/corrupto
     try:
-        quote["params"] = validate_quote_params(quote.get("params") or {})
+        params = validate_quote_params(quote.get("params") or {})
+        if params != quote.get("params"):
+            quote["params"] = params
+            quote.pop("contentHash", None)
     except ValueError as ve:
         quote["status"] = "recalc_required"
         quote["error"] = f"parámetros inválidos: {str(ve)}"
         quote["computed"] = {}
+        quote.pop("contentHash", None)
         quote["price"] = None
-        quote["signature"] = sign_quote(quote)
+        _sign(quote)
         quotes_store.save(quote_id, quote)
         return jsonify({"success": True, "quote": quote}), 200
 
-    current_version = config.get_config_version()
+    current_version = SNAP.config_version
     if quote.get("configVersion") != current_version:
         quote["status"] = "recalc_required"
         quote["requiredConfigVersion"] = current_version
         quote["computed"] = {}
+        quote.pop("contentHash", None)
         quote["price"] = None
         quote["currency"] = quote.get("currency", "EUR")
         quote["refreshedAtTs"] = now
 
-        ttl = int(os.environ.get("QUOTE_TTL_SECONDS", "1800"))
-        quote["expiresAtTs"] = now + ttl
+        quote["expiresAtTs"] = now + QUOTE_TTL_SECONDS
 
-        quote["signature"] = sign_quote(quote)
+        _sign(quote)
         quotes_store.save(quote_id, quote)
         return jsonify({"success": True, "quote": quote}), 200
 
@@ -654,21 +1105,21 @@ def refresh_quote(quote_id: str):
     if quotes_store.is_expired(quote):
         quote["status"] = "estimated"
         quote["refreshedAtTs"] = now
-        ttl = int(os.environ.get("QUOTE_TTL_SECONDS", "1800"))
-        quote["expiresAtTs"] = now + ttl
+        quote["expiresAtTs"] = now + QUOTE_TTL_SECONDS
 
-        quote["signature"] = sign_quote(quote)
+        _sign(quote)
         quotes_store.save(quote_id, quote)
         return jsonify({"success": True, "quote": quote}), 200
 
     # no expiró y config igual -> opcionalmente solo “tocar” TTL o no hacer nada
-    extend_ttl = (request.get_json() or {}).get("extendTtl", False)
-    if extend_ttl:
-        ttl = int(os.environ.get("QUOTE_TTL_SECONDS", "1800"))
-        quote["expiresAtTs"] = now + ttl
+    # el body solo importa aquí: sin body no se parsea nada, y un body vacío
+    # o sin Content-Type JSON ya no da 415
+    body = request.get_json(silent=True) if request.content_length else None
+    if isinstance(body, dict) and body.get("extendTtl", False):
+        quote["expiresAtTs"] = now + QUOTE_TTL_SECONDS
 
     quote["refreshedAtTs"] = now
-    quote["signature"] = sign_quote(quote)
+    _sign(quote)
     quotes_store.save(quote_id, quote)
 
     return jsonify({"success": True, "quote": quote}), 200
@@ -689,7 +1140,7 @@ def lock_quote(quote_id: str):
         return jsonify({"success": False, "error": "Firma no válida"}), 400
 
     # si cambió config -> obliga recalcular (en este paso solo avisamos)
-    current_version = config.get_config_version()
+    current_version = SNAP.config_version
     required = quote.get("requiredConfigVersion") or quote.get("configVersion")
     if required != current_version:
         return jsonify({"success": False, "error": "La configuración cambió; es necesario recalcular"}), 409
@@ -697,10 +1148,9 @@ def lock_quote(quote_id: str):
     quote["status"] = "locked"
     quote["lockedAtTs"] = quotes_store.now()
     # opcional: reduce TTL al lock (ej: 10 min)
-    lock_ttl = int(os.environ.get("QUOTE_LOCK_TTL_SECONDS", "600"))
-    quote["expiresAtTs"] = quotes_store.now() + lock_ttl
+    quote["expiresAtTs"] = quotes_store.now() + QUOTE_LOCK_TTL_SECONDS
 
-    quote["signature"] = sign_quote(quote)
+    _sign(quote)
     quotes_store.save(quote_id, quote)
 
     return jsonify({"success": True, "quote": quote})
@@ -711,7 +1161,7 @@ def lock_quote(quote_id: str):
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """Handle file too large error"""
-    max_size = config.get('file_settings', 'max_file_size_mb', default=100)
+    max_size = SNAP.max_file_size_mb
     return jsonify({
         'success': False,
         'error': f'Archivo demasiado grande. El tamaño máximo es {max_size}MB'
@@ -736,4 +1186,10 @@ def internal_error(error):
 # ============================================================================
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn (gunicorn.conf.py)
+    app.run(
+        host=os.environ.get('FLASK_HOST', '0.0.0.0'),
+        port=int(os.environ.get('FLASK_PORT', '5000')),
+        debug=os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes'),
+        threaded=True,
+    )
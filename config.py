@@ -2,9 +2,11 @@
 Configuration management for Machine Shop Suite - 3D Printing Quote Engine
 """
 import os
+import copy
 import hashlib
-import json
+import orjson
 from pathlib import Path
+from types import SimpleNamespace
 
 
 class Config:
@@ -16,9 +18,27 @@ class Config:
     def get_config_version(self) -> str:
         """
         Hash estable de la config actual para invalidar quotes cuando cambian settings.
+        Se cachea hasta que config_data cambia (ver _invalidate_caches).
         """
-        payload = json.dumps(self.config_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
-        return hashlib.sha256(payload).hexdigest()[:16]
+        if self._version_cache is None:
+            payload = orjson.dumps(self.config_data, option=orjson.OPT_SORT_KEYS)
+            self._version_cache = hashlib.blake2b(payload, digest_size=8).hexdigest()
+        return self._version_cache
+
+    @property
+    def config_data(self):
+        return self._config_data
+
+    @config_data.setter
+    def config_data(self, data):
+        self._config_data = data
+        self._invalidate_caches()
+
+    def _invalidate_caches(self):
+        """Drop values derived from config_data; call after mutating it in place"""
+        self._version_cache = None
+        self._enabled_printers_cache = None
+        self._enabled_pp_cache = None
 
     def __init__(self, config_file=os.environ.get("CONFIG_FILE", "/app/data/config.json")):
         """Initialize configuration from file or defaults"""
@@ -27,13 +47,14 @@ class Config:
 
     def _load_config(self):
         """Load configuration from JSON file or return defaults"""
-        if os.path.exists(self.config_file):
-            try:
-              with open(self.config_file, "r", encoding="utf-8") as f:
-                   return json.load(f)
-            except Exception as e:
-                print(f"Error loading config file: {e}")
-                return self._default_config()
+        try:
+            with open(self.config_file, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            pass  # first run: write the defaults below
+        except Exception as e:
+            print(f"Error loading config file: {e}")
+            return self._default_config()
         data = self._default_config()
         self.config_data = data
         self.save()
@@ -225,15 +246,24 @@ class Config:
             }
         }
 
-    def save(self):
-      """Save current configuration to JSON file (atomic write)"""
+    def with_data(self, data):
+        """Return a copy of this config backed by `data` (self is left untouched)"""
+        candidate = copy.copy(self)
+        candidate.config_data = data
+        return candidate
+
+    def save(self, data=None):
+      """Save current configuration (or `data`, if given) to JSON file (atomic write)"""
+      if data is None:
+        # config_data may have been edited in place since the last hash
+        self._invalidate_caches()
       try:
         config_path = Path(self.config_file)
         config_path.parent.mkdir(parents=True, exist_ok=True)
 
         tmp_path = config_path.with_suffix(config_path.suffix + ".tmp")
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(self.config_data, f, indent=2, ensure_ascii=False)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(self.config_data if data is None else data, option=orjson.OPT_INDENT_2))
 
         os.replace(tmp_path, config_path)  # atomic on same filesystem
         return True
@@ -259,6 +289,7 @@ class Config:
                 data[key] = {}
             data = data[key]
         data[keys[-1]] = value
+        self._invalidate_caches()
 
     def get_materials(self):
         """Get all available materials"""
@@ -289,9 +320,13 @@ class Config:
         return self.config_data.get('printers', {})
 
     def get_enabled_printers(self):
-        """Get only enabled printers"""
-        all_printers = self.get_printers()
-        return {key: printer for key, printer in all_printers.items() if printer.get('enabled', True)}
+        """Get only enabled printers (cached until config_data changes; do not mutate)"""
+        if self._enabled_printers_cache is None:
+            all_printers = self.get_printers()
+            self._enabled_printers_cache = {
+                key: printer for key, printer in all_printers.items() if printer.get('enabled', True)
+            }
+        return self._enabled_printers_cache
 
     def get_printer(self, printer_key):
         """Get specific printer configuration"""
@@ -302,14 +337,45 @@ class Config:
         return self.config_data.get('post_processing', {})
 
     def get_enabled_post_processing(self):
-        """Get only enabled post-processing options"""
-        all_options = self.get_post_processing_options()
-        return {key: option for key, option in all_options.items() if option.get('enabled', True)}
+        """Get only enabled post-processing options (cached until config_data changes; do not mutate)"""
+        if self._enabled_pp_cache is None:
+            all_options = self.get_post_processing_options()
+            self._enabled_pp_cache = {
+                key: option for key, option in all_options.items() if option.get('enabled', True)
+            }
+        return self._enabled_pp_cache
 
     def get_post_processing(self, key):
         """Get specific post-processing option"""
         return self.config_data.get('post_processing', {}).get(key)
 
+    def snapshot(self):
+        """
+        Flatten the sections read on every request into plain attributes,
+        so handlers do a single dict lookup instead of going through getters.
+        Take a new snapshot whenever config_data changes.
+        """
+        return SimpleNamespace(
+            materials=self.get_materials(),
+            qualities=self.get_print_qualities(),
+            infill_options=self.get('infill_options'),
+            pricing=self.get_pricing_config(),
+            pricing_mode=self.get_pricing_mode(),
+            printers=self.get_printers(),
+            enabled_printers=self.get_enabled_printers(),
+            post_processing=self.get_post_processing_options(),
+            enabled_post_processing=self.get_enabled_post_processing(),
+            config_version=self.get_config_version(),
+            slicer_path=self.get_slicer_path(),
+            slicer_timeout=self.get('slicer', 'timeout_seconds', default=300),
+            max_file_size_mb=self.get('file_settings', 'max_file_size_mb', default=100),
+            # key -> (name, price) of enabled options, for quote pricing
+            pp_table={
+                key: (option.get('name', key), option.get('price', 0))
+                for key, option in self.get_enabled_post_processing().items()
+            },
+        )
+
 
 # Global configuration instance
 config = Config()
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for Machine Shop Suite - 3D Printing Quote Engine
+Used by the Docker image (gunicorn -c gunicorn.conf.py app:app).
+Every value can be overridden through GUNICORN_* environment variables.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# N process workers (one per CPU) x threads, so slow uploads and slicer waits
+# overlap inside each worker while the GIL does not serialize the workers
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+# Each worker has its own slicer pool (app.SLICER_POOL): split the CPUs so the
+# whole server runs at most ~cpu_count PrusaSlicer processes at once.
+# Exported before the app is imported (preload_app), so every worker sees it.
+os.environ.setdefault("SLICER_POOL_SIZE", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Import the app once in the master (config, snapshot, prebuilt bodies) and fork
+preload_app = True
+
+# Heartbeat file on tmpfs instead of the container's overlay filesystem
+worker_tmp_dir = "/dev/shm"
+
+# Slicing large models can take minutes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+
+accesslog = "-"
+errorlog = "-"
@@ -1,33 +1,70 @@
-import json
+import orjson
 import os
+import threading
 import time
-import secrets
 import re
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Mapping, Optional, Tuple
 
-QUOTE_ID_RE = re.compile(r"^q_[0-9a-f]{24}$")
+# fullmatch en vez de ^...$: "$" también acepta un "\n" final
+QUOTE_ID_RE = re.compile(r"q_[0-9a-f]{24}")
 DEFAULT_QUOTES_DIR = os.environ.get("QUOTES_DIR", "/app/data/quotes")
+QUOTE_CACHE_SIZE = 1024
+# fsync de cada quote antes del replace: durabilidad ante caídas del host a
+# cambio de latencia en cada save
+QUOTES_FSYNC = os.environ.get("QUOTES_FSYNC", "false").lower() == "true"
 
 def _now_ts() -> int:
     return int(time.time())
 
+def _is_quote(data: Any, quote_id: str) -> bool:
+    """Forma mínima que los handlers dan por hecha (y que firma sign_quote)"""
+    return (
+        isinstance(data, dict)
+        and data.get("quoteId") == quote_id
+        and isinstance(data.get("status"), str)
+        and isinstance(data.get("params", {}), dict)
+        and isinstance(data.get("computed", {}), dict)
+    )
+
 def _atomic_write_json(path: Path, data: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # compacto: los quote.json solo los lee la app (config.json sí va indentado)
+    payload = orjson.dumps(data)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    # el dir solo falta en el primer save del quote: mkdir solo si el open falla
+    try:
+        fd = os.open(tmp, flags, 0o666)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp, flags, 0o666)
+    try:
+        # un único write para un quote normal; el bucle cubre escrituras parciales
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+        if QUOTES_FSYNC:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
     os.replace(tmp, path)
 
 class QuotesStore:
-    def __init__(self, base_dir: str = DEFAULT_QUOTES_DIR):
+    def __init__(self, base_dir: str = DEFAULT_QUOTES_DIR, cache_size: int = QUOTE_CACHE_SIZE):
         self.base = Path(base_dir)
+        # LRU quote_id -> (stat key, quote). Validado con stat en cada load:
+        # save() reemplaza el fichero (inodo nuevo), así que también se ven
+        # los cambios hechos por otros workers
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
 
     def new_id(self) -> str:
-        return f"q_{secrets.token_hex(12)}"
+        return "q_" + os.urandom(12).hex()
 
     def quote_dir(self, quote_id: str) -> Path:
-        if not QUOTE_ID_RE.match(quote_id):
+        if not QUOTE_ID_RE.fullmatch(quote_id):
             raise ValueError("invalid quote id")
         return self.base / quote_id
 
@@ -39,13 +76,87 @@ class QuotesStore:
             p = self.quote_path(quote_id)
         except ValueError:
             return None
-        if not p.exists():
+        # os.open + fstat: el stat de validación es del mismo fichero que leemos
+        # (sin carrera con un os.replace entre medias) y sin pasar por la capa io
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
             return None
         try:
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
+            st = os.fstat(fd)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+            with self._cache_lock:
+                hit = self._cache.get(quote_id)
+                if hit is not None and hit[0] == key:
+                    self._cache.move_to_end(quote_id)
+                    # copia: los handlers reasignan campos del quote antes de guardarlo
+                    return dict(hit[1])
+
+            chunks = []
+            remaining = st.st_size
+            while remaining > 0:
+                chunk = os.read(fd, remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            quote = orjson.loads(chunks[0] if len(chunks) == 1 else b"".join(chunks))
         except Exception:
             return None
+        finally:
+            os.close(fd)
+        # se valida una vez al parsear; lo que entra en el LRU ya es un quote válido
+        if not _is_quote(quote, quote_id):
+            return None
+
+        with self._cache_lock:
+            self._cache[quote_id] = (key, quote)
+            self._cache.move_to_end(quote_id)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return dict(quote)
+
+    def list(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        q: str = "",
+        fields: Optional[Mapping[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Lista quotes ordenados por id, paginando con cursor = último id devuelto.
+        Filtra por status exacto y por q (subcadena en el id o en los params),
+        y devuelve solo los campos de `fields` (campo -> valor si falta) de cada
+        quote, o el quote entero si es None.
+        """
+        try:
+            ids = sorted(e.name for e in os.scandir(self.base) if QUOTE_ID_RE.fullmatch(e.name))
+        except FileNotFoundError:
+            ids = []
+
+        items = []
+        last_id = next_cursor = None
+        for quote_id in ids:
+            if cursor and quote_id <= cursor:
+                continue
+            quote = self.load(quote_id)
+            if quote is None:
+                continue
+            if status and quote.get("status") != status:
+                continue
+            if q and q not in quote_id and not any(
+                q in str(v).lower() for v in (quote.get("params") or {}).values()
+            ):
+                continue
+            if len(items) == limit:
+                next_cursor = last_id
+                break
+            items.append(quote if fields is None else {f: quote.get(f, d) for f, d in fields.items()})
+            last_id = quote_id
+
+        return {"items": items, "nextCursor": next_cursor}
 
     def exists(self, quote_id: str) -> bool:
         try:
@@ -56,6 +167,8 @@ class QuotesStore:
     def save(self, quote_id: str, quote: Dict[str, Any]) -> None:
         # save sólo lo llamas con ids generados por ti, pero por seguridad:
         _atomic_write_json(self.quote_path(quote_id), quote)
+        with self._cache_lock:
+            self._cache.pop(quote_id, None)
 
     def is_expired(self, quote: Dict[str, Any]) -> bool:
         exp = quote.get("expiresAtTs")
@@ -1,32 +1,105 @@
 import hmac
 import hashlib
 import os
-import json
+import struct
+import orjson
 from typing import Any, Dict
 
 HMAC_SECRET = os.environ.get("QUOTE_HMAC_SECRET") or os.environ.get("SECRET_KEY") or "dev-secret"
 
+# Key for BLAKE2b's native keyed mode (max 64 bytes: longer secrets are hashed down)
+_SIGNING_KEY = HMAC_SECRET.encode("utf-8")
+if len(_SIGNING_KEY) > hashlib.blake2b.MAX_KEY_SIZE:
+    _SIGNING_KEY = hashlib.blake2b(_SIGNING_KEY).digest()
+# Keyed states with the key already absorbed; signing works on copies.
+# QUOTE_SIG_ALGO picks the one used to sign; verify_quote accepts either, so
+# switching between them keeps quotes signed in SIGNATURE_FORMAT valid.
+# Quotes signed before that format (pipe-joined text message) verify under
+# neither and are invalidated.
+_SIGNERS = {
+    "blake2b": hashlib.blake2b(key=_SIGNING_KEY, digest_size=32),
+    "hmac-sha256": hmac.new(HMAC_SECRET.encode("utf-8"), digestmod=hashlib.sha256),
+}
+QUOTE_SIG_ALGO = os.environ.get("QUOTE_SIG_ALGO", "blake2b").lower()
+if QUOTE_SIG_ALGO not in _SIGNERS:
+    raise ValueError(f"QUOTE_SIG_ALGO must be one of {sorted(_SIGNERS)}, got {QUOTE_SIG_ALGO!r}")
+_SIGNER = _SIGNERS[QUOTE_SIG_ALGO]
+# verify order: configured algorithm first
+_VERIFIERS = [_SIGNER] + [s for name, s in _SIGNERS.items() if name != QUOTE_SIG_ALGO]
 
-def _stable_json(obj: Any) -> str:
-    return json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+# Leading byte of every signed message; bump it if the layout below changes
+SIGNATURE_FORMAT = b"\x01"
+_pack_double = struct.Struct(">d").pack
+_pack_int64 = struct.Struct(">q").pack
 
-def sign_quote(payload: Dict[str, Any]) -> str:
-    params_hash = hashlib.sha256(_stable_json(payload.get("params", {})).encode("utf-8")).hexdigest()
-    computed_hash = hashlib.sha256(_stable_json(payload.get("computed", {})).encode("utf-8")).hexdigest()
 
-    msg = "|".join([
+def _stable_json(obj: Any, sort_keys: bool = True) -> bytes:
+    """Compact UTF-8 JSON for hashing; sort_keys=False keeps insertion order"""
+    if sort_keys:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+def content_hash(payload: Dict[str, Any], sort_keys: bool = False) -> str:
+    """
+    Hash of the bulky part of a quote (params + computed). Stored on the quote
+    as contentHash so re-signing after status/TTL changes skips the JSON dump;
+    recompute it whenever params or computed change.
+
+    Keys are hashed in insertion order by default: the hash is taken from the
+    same dicts that get stored, and the quote store keeps their order on
+    disk. Pass sort_keys=True to compare content built elsewhere.
+    """
+    content = [payload.get("params", {}), payload.get("computed", {})]
+    return hashlib.blake2b(_stable_json(content, sort_keys), digest_size=16).hexdigest()
+
+
+def _number_field(value: Any, tag: bytes, pack) -> bytes:
+    """tag + fixed-size big-endian number; b"n" for a missing value, b"s" + UTF-8 text otherwise"""
+    if value is None:
+        return b"n"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return tag + pack(value)
+        except (struct.error, OverflowError):
+            pass
+    return b"s" + str(value).encode("utf-8")
+
+
+def sign_quote(payload: Dict[str, Any], signer=None) -> str:
+    """
+    Signed message (format 1):
+      0x01 || quoteId|status|currency|configVersion|contentHash (UTF-8)
+           || "|" || price || "|" || expiresAtTs
+    price is b"d" + big-endian float64 and expiresAtTs b"q" + big-endian int64
+    (see _number_field for missing / non-numeric values).
+    MAC'd with the QUOTE_SIG_ALGO state unless `signer` is given.
+    """
+    # the usual types are packed inline; _number_field covers the rest
+    price = payload.get("price")
+    expires = payload.get("expiresAtTs")
+    mac = (signer or _SIGNER).copy()
+    mac.update(SIGNATURE_FORMAT)
+    mac.update("|".join([
         str(payload.get("quoteId", "")),
         str(payload.get("status", "")),
-        str(payload.get("price", "")),
         str(payload.get("currency", "")),
         str(payload.get("configVersion", "")),
-        str(payload.get("expiresAtTs", "")),
-        params_hash,
-        computed_hash,
-    ]).encode("utf-8")
-    return hmac.new(HMAC_SECRET.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+        payload.get("contentHash") or content_hash(payload),
+    ]).encode("utf-8"))
+    mac.update(b"|d" + _pack_double(price) if price.__class__ is float
+               else b"|" + _number_field(price, b"d", _pack_double))
+    try:
+        mac.update(b"|q" + _pack_int64(expires) if expires.__class__ is int
+                   else b"|" + _number_field(expires, b"q", _pack_int64))
+    except struct.error:  # int outside int64
+        mac.update(b"|" + _number_field(expires, b"q", _pack_int64))
+    # keyed BLAKE2b is a MAC on its own: one pass instead of HMAC's two
+    return mac.hexdigest()
 
 
 def verify_quote(payload: Dict[str, Any], signature: str) -> bool:
-    expected = sign_quote(payload)
-    return hmac.compare_digest(expected, signature or "")
\ No newline at end of file
+    signature = signature or ""
+    for signer in _VERIFIERS:
+        if hmac.compare_digest(sign_quote(payload, signer), signature):
+            return True
+    return False
\ No newline at end of file
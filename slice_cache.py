@@ -0,0 +1,129 @@
+import hashlib
+import itertools
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+DEFAULT_SLICE_CACHE_DIR = os.environ.get("SLICE_CACHE_DIR", "/app/data/slice_cache")
+DEFAULT_SLICE_CACHE_TTL = int(os.environ.get("SLICE_CACHE_TTL_SECONDS", str(7 * 86400)))
+# Max entries kept on disk; the oldest go first once a sweep finds more
+DEFAULT_SLICE_CACHE_MAX_ENTRIES = int(os.environ.get("SLICE_CACHE_MAX_ENTRIES", "10000"))
+# Sweep the directory once every this many set() calls (per process)
+SWEEP_EVERY = 256
+# Leftover .tmp files from a writer that died mid-write
+STALE_TMP_SECONDS = 3600
+
+
+def _now_ts() -> int:
+    return int(time.time())
+
+
+class SliceCache:
+    """
+    Content-addressed cache of slicing results.
+    Key = sha256(STL bytes) + slicing params; value = filament info dict.
+    Stored as one JSON file per key so every gunicorn worker shares it.
+    Expired entries are dropped when read and by a sweep every SWEEP_EVERY
+    writes, which also caps the directory at max_entries.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = DEFAULT_SLICE_CACHE_DIR,
+        ttl: int = DEFAULT_SLICE_CACHE_TTL,
+        max_entries: int = DEFAULT_SLICE_CACHE_MAX_ENTRIES,
+    ):
+        self.base = Path(base_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = itertools.count(1)
+
+    def key(self, stl_digest: str, params: Dict[str, Any]) -> str:
+        params_json = orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(stl_digest.encode("utf-8") + b"|" + params_json).hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        return self.base / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        p = self.entry_path(key)
+        try:
+            entry = orjson.loads(p.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return None
+        # anything but {"createdAtTs": int, "data": {...}} is treated as expired
+        created = entry.get("createdAtTs") if isinstance(entry, dict) else None
+        if (
+            not isinstance(created, int)
+            or not isinstance(entry.get("data"), dict)
+            or _now_ts() - created > self.ttl
+        ):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+            return None
+        return entry["data"]
+
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        self.base.mkdir(parents=True, exist_ok=True)
+        # temp name único: varios workers pueden escribir la misma key a la vez
+        fd, tmp = tempfile.mkstemp(dir=self.base, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps({"createdAtTs": _now_ts(), "data": data}))
+            os.replace(tmp, self.entry_path(key))
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        if next(self._writes) % SWEEP_EVERY == 0:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """
+        Delete expired entries (by file mtime: entries are written once) and
+        stale temp files, then the oldest entries beyond max_entries.
+        Returns how many files were removed.
+        """
+        now = time.time()
+        live = []
+        doomed = []
+        try:
+            with os.scandir(self.base) as it:
+                for e in it:
+                    try:
+                        mtime = e.stat().st_mtime
+                    except OSError:
+                        continue  # borrado por otro worker
+                    if e.name.endswith(".tmp"):
+                        if now - mtime > STALE_TMP_SECONDS:
+                            doomed.append(e.path)
+                    elif e.name.endswith(".json"):
+                        if now - mtime > self.ttl:
+                            doomed.append(e.path)
+                        else:
+                            live.append((mtime, e.path))
+        except FileNotFoundError:
+            return 0
+
+        if len(live) > self.max_entries:
+            live.sort()
+            doomed.extend(path for _, path in live[:len(live) - self.max_entries])
+
+        removed = 0
+        for path in doomed:
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,42 @@
+"""
+Shared fixtures. The app reads its paths and tokens from the environment at
+import time, so everything is pointed at a throwaway directory before the
+first `import app`.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="quote-engine-tests-")
+ADMIN_TOKEN = "test-admin-token"
+
+os.environ.update(
+    CONFIG_FILE=os.path.join(DATA_DIR, "config.json"),
+    QUOTES_DIR=os.path.join(DATA_DIR, "quotes"),
+    SLICE_CACHE_DIR=os.path.join(DATA_DIR, "slice_cache"),
+    UPLOAD_DIR=os.path.join(DATA_DIR, "uploads"),
+    ADMIN_TOKEN=ADMIN_TOKEN,
+    QUOTE_HMAC_SECRET="test-secret",
+)
+sys.path.insert(0, ROOT)
+# the app writes logs/ relative to the working directory
+os.chdir(DATA_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app as app_module
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def admin_headers():
+    return {"X-Admin-Token": ADMIN_TOKEN}
@@ -0,0 +1,50 @@
+import pytest
+
+ITEM = {
+    "material": "pla",
+    "quality": "standard",
+    "printer": "prusa_mk3s",
+    "filament_weight_g": 25.0,
+    "print_time_hours": 1.5,
+    "post_processing": ["sanding"],
+}
+
+
+def test_calculate_quote(client):
+    r = client.post("/api/calculate-quote", json=ITEM)
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["success"] is True
+    assert body["quote"]
+
+
+@pytest.mark.parametrize("post_processing", [[{"a": 1}], [["sanding"]], [1], 5])
+def test_malformed_post_processing_is_400(client, post_processing):
+    r = client.post("/api/calculate-quote", json=dict(ITEM, post_processing=post_processing))
+    assert r.status_code == 400
+    assert r.get_json()["error"].startswith("post_processing debe ser una lista")
+
+
+def test_single_post_processing_key(client):
+    r = client.post("/api/calculate-quote", json=dict(ITEM, post_processing="sanding"))
+    assert r.status_code == 200
+
+
+def test_batch_keeps_valid_items_next_to_malformed_ones(client):
+    r = client.post("/api/calculate-quote/batch", json=[
+        ITEM,
+        dict(ITEM, post_processing=[{"a": 1}]),
+        dict(ITEM, material="unobtainium"),
+        "not an object",
+    ])
+    assert r.status_code == 200
+    results = r.get_json()["quotes"]
+    assert [res["success"] for res in results] == [True, False, False, False]
+    assert results[0]["quote"] == client.post("/api/calculate-quote", json=ITEM).get_json()["quote"]
+    assert results[1]["error"] == "post_processing debe ser una lista de claves"
+
+
+def test_batch_rejects_non_lists_and_oversized_batches(app_module, client):
+    assert client.post("/api/calculate-quote/batch", json=ITEM).status_code == 400
+    too_many = [ITEM] * (app_module.MAX_BATCH_QUOTES + 1)
+    assert client.post("/api/calculate-quote/batch", json=too_many).status_code == 400
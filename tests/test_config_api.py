@@ -0,0 +1,29 @@
+import gzip
+
+import orjson
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/config", "/api/materials"])
+@pytest.mark.parametrize("method", ["get", "head"])
+def test_identity_response_has_no_content_encoding(client, path, method):
+    r = getattr(client, method)(path)
+    assert r.status_code == 200
+    assert "Content-Encoding" not in r.headers
+    assert "Accept-Encoding" in r.headers["Vary"]
+
+
+def test_gzip_response(app_module, client):
+    assert app_module.SNAP.config_json[2] is not None  # big enough to be precompressed
+    r = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.headers["ETag"].endswith('-gz"')
+    assert orjson.loads(gzip.decompress(r.data))["success"] is True
+
+
+def test_matching_etag_is_304(client):
+    etag = client.get("/api/config").headers["ETag"]
+    r = client.get("/api/config", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert not r.data
@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture
+def debug_app(app_module):
+    app = app_module.app
+    app.debug = True
+    yield app
+    app.debug = False
+
+
+def test_debug_responses_keep_non_str_keys(debug_app):
+    with debug_app.test_request_context():
+        r = debug_app.json.response({1: "a", "b": {2.5: None}})
+    assert r.get_data(as_text=True) == '{\n  "1": "a",\n  "b": {\n    "2.5": null\n  }\n}\n'
+
+
+def test_compact_responses(app_module):
+    app = app_module.app
+    with app.test_request_context():
+        r = app.json.response({1: "a"})
+    assert r.get_data() == b'{"1":"a"}\n'
+    assert r.mimetype == "application/json"
+
@@ -0,0 +1,24 @@
+def test_index_renders(client):
+    r = client.get("/")
+    assert r.status_code == 200
+    assert b"<html" in r.data.lower()
+
+
+def test_index_does_not_leak_admin_token(client, admin_headers):
+    token = admin_headers["X-Admin-Token"]
+    assert client.get(f"/?token={token}").status_code == 200
+
+    r = client.get("/")
+    assert r.status_code == 200
+    assert token.encode() not in r.data
+
+
+def test_index_settings_link_keeps_callers_token(client, admin_headers):
+    token = admin_headers["X-Admin-Token"]
+    r = client.get(f"/?token={token}")
+    assert f"token={token}".encode() in r.data
+
+
+def test_settings_page_requires_admin(client, admin_headers):
+    assert client.get("/settings").status_code == 401
+    assert client.get("/settings", headers=admin_headers).status_code == 200
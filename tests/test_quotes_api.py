@@ -0,0 +1,21 @@
+def test_list_fills_missing_currency_and_params(app_module, client, admin_headers):
+    store = app_module.quotes_store
+    quote_id = store.new_id()
+    store.save(quote_id, {"quoteId": quote_id, "status": "legacy"})
+
+    r = client.get("/api/quotes?status=legacy", headers=admin_headers)
+    assert r.status_code == 200
+    (item,) = r.get_json()["items"]
+    assert item == {
+        "quoteId": quote_id,
+        "status": "legacy",
+        "createdAtTs": None,
+        "expiresAtTs": None,
+        "price": None,
+        "currency": "EUR",
+        "params": {},
+    }
+
+
+def test_list_requires_admin(client):
+    assert client.get("/api/quotes").status_code == 401
@@ -0,0 +1,105 @@
+import shutil
+
+import pytest
+
+from quotes_store import QuotesStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return QuotesStore(str(tmp_path / "quotes"))
+
+
+def make_quote(store, **extra):
+    quote_id = store.new_id()
+    quote = {"quoteId": quote_id, "status": "draft", "params": {"material": "pla"}, "computed": {}}
+    quote.update(extra)
+    return quote_id, quote
+
+
+def test_save_creates_base_dir_and_loads_back(store):
+    quote_id, quote = make_quote(store, price=12.5)
+    assert not store.base.exists()
+    store.save(quote_id, quote)
+    assert store.exists(quote_id)
+    assert store.load(quote_id) == quote
+
+
+def test_load_returns_copies(store):
+    quote_id, quote = make_quote(store)
+    store.save(quote_id, quote)
+    store.load(quote_id)["status"] = "accepted"
+    assert store.load(quote_id)["status"] == "draft"
+
+
+def test_load_sees_rewrites_from_other_stores(store):
+    quote_id, quote = make_quote(store)
+    store.save(quote_id, quote)
+    assert store.load(quote_id)["status"] == "draft"
+
+    other = QuotesStore(str(store.base))
+    other.save(quote_id, dict(quote, status="accepted"))
+    assert store.load(quote_id)["status"] == "accepted"
+
+
+@pytest.mark.parametrize("quote_id", ["../etc", "q_123", "q_" + "0" * 24 + "\n"])
+def test_invalid_ids(store, quote_id):
+    assert store.load(quote_id) is None
+    assert not store.exists(quote_id)
+    with pytest.raises(ValueError):
+        store.save(quote_id, {})
+
+
+def test_load_rejects_malformed_files(store):
+    quote_id, quote = make_quote(store)
+    store.save(quote_id, dict(quote, quoteId=store.new_id()))
+    assert store.load(quote_id) is None
+
+    (store.base / quote_id / "quote.json").write_bytes(b"{not json")
+    assert store.load(quote_id) is None
+    assert store.load(store.new_id()) is None
+
+
+def test_recreated_base_dir(store):
+    quote_id, quote = make_quote(store)
+    store.save(quote_id, quote)
+
+    # borrado: el save lo vuelve a crear
+    shutil.rmtree(store.base)
+    store.save(quote_id, quote)
+    assert (store.base / quote_id / "quote.json").exists()
+
+    # recreado por fuera: se ve lo que hay en el dir nuevo
+    shutil.rmtree(store.base)
+    other = QuotesStore(str(store.base))
+    other.save(quote_id, dict(quote, status="accepted"))
+    assert store.exists(quote_id)
+    assert store.load(quote_id)["status"] == "accepted"
+
+
+def test_list_pages_filters_and_projects(store):
+    ids = []
+    for i, (status, material) in enumerate([("draft", "pla"), ("accepted", "petg"), ("draft", "petg")]):
+        quote_id, quote = make_quote(store, status=status, params={"material": material}, price=i)
+        store.save(quote_id, quote)
+        ids.append(quote_id)
+    ids.sort()
+
+    page = store.list(limit=2)
+    assert [it["quoteId"] for it in page["items"]] == ids[:2]
+    assert page["nextCursor"] == ids[1]
+    rest = store.list(limit=2, cursor=page["nextCursor"])
+    assert [it["quoteId"] for it in rest["items"]] == ids[2:]
+    assert rest["nextCursor"] is None
+
+    assert {it["status"] for it in store.list(status="draft")["items"]} == {"draft"}
+    assert {it["params"]["material"] for it in store.list(q="petg")["items"]} == {"petg"}
+    assert store.list(q=ids[0][-6:])["items"][0]["quoteId"] == ids[0]
+
+    items = store.list(fields={"quoteId": None, "price": None, "currency": "EUR"})["items"]
+    assert all(set(it) == {"quoteId", "price", "currency"} for it in items)
+    assert all(it["currency"] == "EUR" for it in items)
+
+
+def test_list_without_dir(store):
+    assert store.list() == {"items": [], "nextCursor": None}
@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+
+import security
+from security import content_hash, sign_quote, verify_quote
+
+
+@pytest.fixture
+def quote():
+    q = {
+        "quoteId": "q_" + "ab" * 12,
+        "status": "draft",
+        "price": 12.5,
+        "currency": "EUR",
+        "configVersion": 3,
+        "expiresAtTs": 1_700_000_000,
+        "params": {"material": "pla", "infill": 20},
+        "computed": {"weight_g": 42.0},
+    }
+    q["contentHash"] = content_hash(q)
+    return q
+
+
+def test_sign_and_verify(quote):
+    sig = sign_quote(quote)
+    assert len(sig) == 64 and int(sig, 16) >= 0
+    assert verify_quote(quote, sig)
+    assert not verify_quote(quote, "")
+    assert not verify_quote(quote, None)
+    assert not verify_quote(quote, "0" * 64)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("quoteId", "q_" + "cd" * 12),
+    ("status", "accepted"),
+    ("currency", "USD"),
+    ("configVersion", 4),
+    ("contentHash", "0" * 32),
+    ("price", 12.51),
+    ("price", None),
+    ("price", "12.5"),
+    ("expiresAtTs", 1_700_000_001),
+    ("expiresAtTs", None),
+])
+def test_every_signed_field_changes_the_signature(quote, field, value):
+    sig = sign_quote(quote)
+    assert not verify_quote(dict(quote, **{field: value}), sig)
+
+
+def test_numeric_fields_are_signed_by_value(quote):
+    # int and float prices pack to the same float64
+    assert sign_quote(dict(quote, price=12)) == sign_quote(dict(quote, price=12.0))
+    # a missing field and an explicit None are the same "n" marker
+    assert sign_quote({k: v for k, v in quote.items() if k != "price"}) == sign_quote(dict(quote, price=None))
+    # ints that do not fit in int64 fall back to text instead of failing
+    huge = dict(quote, expiresAtTs=2**70)
+    assert verify_quote(huge, sign_quote(huge))
+    assert sign_quote(huge) != sign_quote(dict(quote, expiresAtTs=-2**70))
+
+
+def test_signature_uses_cached_content_hash(quote):
+    sig = sign_quote(quote)
+    quote["params"]["material"] = "petg"  # contentHash not recomputed
+    assert verify_quote(quote, sig)
+    del quote["contentHash"]
+    assert not verify_quote(quote, sig)
+
+
+def test_content_hash_key_order(quote):
+    reordered = dict(quote, params=dict(reversed(list(quote["params"].items()))))
+    assert content_hash(reordered) != content_hash(quote)
+    assert content_hash(reordered, sort_keys=True) == content_hash(quote, sort_keys=True)
+
+
+@pytest.mark.parametrize("algo", sorted(security._SIGNERS))
+def test_verify_accepts_both_algorithms(quote, algo):
+    sig = sign_quote(quote, security._SIGNERS[algo])
+    assert verify_quote(quote, sig)
+
+
+def test_format_byte_is_signed(quote):
+    signer = security._SIGNER.copy()
+    sig = sign_quote(quote, signer)
+    assert sign_quote(quote, security._SIGNER) == sig  # the shared state is not consumed
+    assert sig != sign_quote(quote, hashlib.blake2b(key=b"other", digest_size=32))
+
+
+def test_pre_format_signatures_are_rejected(quote):
+    # HMAC-SHA256 over the old pipe-joined text message
+    def part(obj):
+        return hashlib.sha256(
+            json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    msg = "|".join([
+        quote["quoteId"], quote["status"], str(quote["price"]), quote["currency"],
+        str(quote["configVersion"]), str(quote["expiresAtTs"]),
+        part(quote["params"]), part(quote["computed"]),
+    ]).encode("utf-8")
+    legacy = hmac.new(security.HMAC_SECRET.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+    assert not verify_quote(quote, legacy)
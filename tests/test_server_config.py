@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+import runpy
+
+from conftest import ROOT
+
+GUNICORN_CONF = os.path.join(ROOT, "gunicorn.conf.py")
+
+
+def test_slicer_pool_split_across_workers(monkeypatch):
+    monkeypatch.delenv("SLICER_POOL_SIZE", raising=False)
+    monkeypatch.setenv("GUNICORN_WORKERS", "2")
+    conf = runpy.run_path(GUNICORN_CONF)
+    per_worker = int(os.environ["SLICER_POOL_SIZE"])
+    assert per_worker == max(1, multiprocessing.cpu_count() // 2)
+    assert per_worker * conf["workers"] <= max(2, multiprocessing.cpu_count())
+
+
+def test_slicer_pool_size_env_override_wins(monkeypatch):
+    monkeypatch.setenv("SLICER_POOL_SIZE", "3")
+    runpy.run_path(GUNICORN_CONF)
+    assert os.environ["SLICER_POOL_SIZE"] == "3"
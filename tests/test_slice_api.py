@@ -0,0 +1,41 @@
+import hashlib
+import io
+
+STL = b"solid cube\nendsolid cube\n"
+
+
+def seed_cache(app_module, data):
+    snap = app_module.SNAP
+    params, _ = app_module._build_slice_params(snap, app_module.SliceRequest())
+    key = app_module.slice_cache.key(
+        hashlib.sha256(STL).hexdigest(), {**params, "slicer_path": snap.slicer_path}
+    )
+    app_module.slice_cache.set(key, data)
+
+
+def test_multipart_upload_is_hashed_while_parsed(app_module, client):
+    seed_cache(app_module, {"filament_g": 7.5})
+    r = client.post("/api/slice", data={"file": (io.BytesIO(STL), "cube.stl")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 200
+    assert r.get_json()["data"] == {"filament_g": 7.5}
+
+
+def test_raw_body_upload(app_module, client):
+    seed_cache(app_module, {"filament_g": 7.5})
+    r = client.post("/api/slice-stream?filename=cube.stl", data=STL,
+                    content_type="application/octet-stream")
+    assert r.status_code == 200
+    assert r.get_json()["data"] == {"filament_g": 7.5}
+
+
+def test_empty_upload_is_400(client):
+    r = client.post("/api/slice", data={"file": (io.BytesIO(b""), "cube.stl")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 400
+
+
+def test_non_stl_upload_is_400(client):
+    r = client.post("/api/slice", data={"file": (io.BytesIO(STL), "cube.obj")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 400
@@ -0,0 +1,101 @@
+import os
+import time
+
+import pytest
+
+import slice_cache
+from slice_cache import SliceCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SliceCache(str(tmp_path / "slices"), ttl=60, max_entries=3)
+
+
+def age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_key_depends_on_stl_and_params(cache):
+    k = cache.key("abc", {"a": 1, "b": 2})
+    assert k == cache.key("abc", {"b": 2, "a": 1})
+    assert k != cache.key("abd", {"a": 1, "b": 2})
+    assert k != cache.key("abc", {"a": 1, "b": 3})
+
+
+def test_hit_and_miss(cache):
+    key = cache.key("abc", {})
+    assert cache.get(key) is None
+    cache.set(key, {"filament_g": 12.3})
+    assert cache.get(key) == {"filament_g": 12.3}
+    assert not list(cache.base.glob("*.tmp"))
+
+
+def test_expired_entry_is_dropped_on_read(cache, monkeypatch):
+    key = cache.key("abc", {})
+    cache.set(key, {"filament_g": 1})
+    monkeypatch.setattr(slice_cache, "_now_ts", lambda: int(time.time()) + 61)
+    assert cache.get(key) is None
+    assert not cache.entry_path(key).exists()
+
+
+@pytest.mark.parametrize("content", [
+    "{",
+    "[]",
+    "42",
+    "null",
+    '{"data": {"filament_g": 1}}',
+    '{"createdAtTs": "now", "data": {}}',
+    '{"createdAtTs": 1, "data": [1]}',
+])
+def test_malformed_entry_is_a_miss(cache, content):
+    key = cache.key("abc", {})
+    cache.set(key, {"filament_g": 1})
+    cache.entry_path(key).write_text(content)
+    assert cache.get(key) is None
+    if content != "{":
+        assert not cache.entry_path(key).exists()
+
+
+def test_sweep_removes_expired_and_stale_tmp(cache):
+    fresh, old = cache.key("fresh", {}), cache.key("old", {})
+    cache.set(fresh, {})
+    cache.set(old, {})
+    age(cache.entry_path(old), 120)
+    stale_tmp = cache.base / "x.tmp"
+    stale_tmp.write_text("")
+    age(stale_tmp, slice_cache.STALE_TMP_SECONDS + 1)
+    live_tmp = cache.base / "y.tmp"
+    live_tmp.write_text("")
+
+    assert cache.sweep() == 2
+    assert cache.entry_path(fresh).exists()
+    assert not cache.entry_path(old).exists()
+    assert not stale_tmp.exists()
+    assert live_tmp.exists()
+
+
+def test_sweep_caps_entries_oldest_first(cache):
+    keys = [cache.key(str(i), {}) for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.set(key, {"i": i})
+        age(cache.entry_path(key), 50 - i)
+
+    assert cache.sweep() == 2
+    assert [cache.get(k) is not None for k in keys] == [False, False, True, True, True]
+
+
+def test_set_sweeps_periodically(cache, monkeypatch):
+    monkeypatch.setattr(slice_cache, "SWEEP_EVERY", 4)
+    keys = [cache.key(str(i), {}) for i in range(4)]
+    for key in keys[:3]:
+        cache.set(key, {})
+    for key in keys[:3]:
+        age(cache.entry_path(key), 120)
+    cache.set(keys[3], {})  # 4th write triggers the sweep
+    assert [p.name for p in cache.base.iterdir()] == [keys[3] + ".json"]
+
+
+def test_sweep_without_dir(tmp_path):
+    assert SliceCache(str(tmp_path / "missing")).sweep() == 0
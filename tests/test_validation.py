@@ -0,0 +1,67 @@
+import copy
+
+import pytest
+
+
+@pytest.fixture
+def settings(client, admin_headers):
+    """Current settings; anything posted during the test is rolled back"""
+    original = client.get("/api/settings", headers=admin_headers).get_json()["settings"]
+    yield copy.deepcopy(original)
+    assert client.post("/api/settings", json=original, headers=admin_headers).status_code == 200
+
+
+QUOTE = {"params": {"material": "pla", "quality": "standard", "printer": "prusa_mk3s"}}
+
+
+def test_disabled_printer_rejected_after_settings_update(client, admin_headers, settings):
+    assert client.post("/api/quotes", json=QUOTE).status_code == 201
+
+    settings["printers"]["prusa_mk3s"]["enabled"] = False
+    assert client.post("/api/settings", json=settings, headers=admin_headers).status_code == 200
+
+    r = client.post("/api/quotes", json=QUOTE)
+    assert r.status_code == 400
+    assert "impresora" in r.get_json()["error"]
+
+
+def test_old_snapshot_cannot_repopulate_new_one(app_module, client, admin_headers, settings):
+    old_snap = app_module.SNAP
+    settings["printers"]["prusa_mk3s"]["enabled"] = False
+    assert client.post("/api/settings", json=settings, headers=admin_headers).status_code == 200
+
+    # a request still running on the old snapshot validates the combo...
+    app_module._check_quote_options(old_snap, "pla", "standard", "prusa_mk3s")
+    # ...but the current snapshot still rejects it
+    with pytest.raises(ValueError):
+        app_module._check_quote_options(app_module.SNAP, "pla", "standard", "prusa_mk3s")
+
+
+def test_invalid_options_are_not_memoized(app_module):
+    snap = app_module.SNAP
+    with pytest.raises(ValueError):
+        app_module._check_quote_options(snap, "nope", "standard", "prusa_mk3s")
+    assert ("nope", "standard", "prusa_mk3s") not in snap.valid_quote_options
+
+
+def test_slice_params_follow_settings_update(app_module, client, admin_headers, settings):
+    req = app_module.SliceRequest()
+    old_snap = app_module.SNAP
+    params, error = app_module._build_slice_params(old_snap, req)
+    assert error is None
+
+    settings["materials"]["pla"]["bed_temp"] = params["bed_temp"] + 5
+    assert client.post("/api/settings", json=settings, headers=admin_headers).status_code == 200
+
+    # the old snapshot keeps its own memo; the new one starts empty
+    assert app_module._build_slice_params(old_snap, req)[0]["bed_temp"] == params["bed_temp"]
+    new_params, _ = app_module._build_slice_params(app_module.SNAP, req)
+    assert new_params["bed_temp"] == params["bed_temp"] + 5
+
+
+def test_slice_params_memo_is_capped(app_module, monkeypatch):
+    snap = app_module._build_snapshot()
+    monkeypatch.setattr(app_module, "SLICE_PARAMS_CACHE_SIZE", 2)
+    for infill in range(10, 15):
+        app_module._build_slice_params(snap, app_module.SliceRequest(infill_density=infill))
+    assert len(snap.slice_params) == 2
@@ -1,10 +1,54 @@
 """
 Utility functions for 3D printing quote engine
 """
+import math
 import os
+import mmap
+import shutil
 import subprocess
+import tempfile
 import re
 
+# Upload extensions accepted by the slice endpoints
+ALLOWED_EXTENSIONS = frozenset({'stl'})
+_ALLOWED_SUFFIXES = tuple('.' + ext for ext in ALLOWED_EXTENSIONS)
+
+# Bytes read from the end of the G-code when looking for the slicer summary
+GCODE_TAIL_BYTES = 64 * 1024
+
+# 1.75 mm filament: radius 0.0875 cm, cross-section area in cm2
+FILAMENT_RADIUS_CM = 0.175 / 2
+FILAMENT_CROSS_SECTION_CM2 = math.pi * FILAMENT_RADIUS_CM ** 2
+# PLA density, used when the G-code only gives length or volume
+PLA_DENSITY_G_CM3 = 1.24
+
+# Bytes of slicer stderr kept for the error message (the end holds the error)
+SLICER_STDERR_TAIL_BYTES = 8 * 1024
+
+# Configured slicer path -> resolved executable (only successful lookups)
+_resolved_slicers = {}
+
+# PrusaSlicer summary comments, all in one pattern so a single scan fills every
+# field (see _parse_gcode_summary). Byte pattern: it runs on the raw tail or on
+# an mmap of the whole file.
+#   ; filament used [mm|g|cm3] = 1.23   or   ; filament_used_mm|g = 1.23
+#   ; estimated printing time (normal mode) = [Nd] [Nh] [Nm|Nmin] [Ns]  (days skipped)
+_RE_SUMMARY = re.compile(
+    rb';\s*(?:'
+    rb'filament(?:\s+used\s*\[(?P<unit>mm|g|cm3)\]|_used_(?P<alt_unit>mm|g))\s*=\s*(?P<value>[\d.]+)'
+    rb'|estimated\s+printing\s+time.*?=\s*'
+    rb'(?:\d+\s*d\s*)?(?:(?P<h>\d+)\s*h\s*)?(?:(?P<m>\d+)\s*m(?:in)?\s*)?(?:(?P<s>\d+)\s*s)?'
+    rb')',
+    re.IGNORECASE)
+# First E value on a line starting with G1, scanned over the raw file in one
+# pass. The leading \n gives the engine a literal to search for; the first
+# line of the file is checked separately with the unprefixed pattern.
+_G1_E = rb'G1[^\r\n]*?E([\d.]+)'
+_RE_G1_E_LINE = re.compile(rb'\n' + _G1_E)
+_RE_G1_E_FIRST = re.compile(_G1_E)
+# Bytes per findall() window in the extrusion scan (cut at the next newline)
+GCODE_SCAN_WINDOW = 4 * 1024 * 1024
+
 
 def allowed_file(filename):
     """
@@ -16,11 +60,27 @@ def allowed_file(filename):
     Returns:
         bool: True if file extension is allowed, False otherwise
     """
-    ALLOWED_EXTENSIONS = {'stl'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 
-def convert_stl_to_gcode(input_path, output_path, params, slicer_path):
+def resolve_slicer(slicer_path):
+    """
+    Resolve the slicer executable, either a path or a name on PATH.
+    The lookup is done once per configured path; misses are not cached so a
+    slicer installed later is still picked up.
+
+    Returns:
+        str or None: Executable path, or None if not found
+    """
+    resolved = _resolved_slicers.get(slicer_path)
+    if resolved is None:
+        resolved = shutil.which(slicer_path)
+        if resolved is not None:
+            _resolved_slicers[slicer_path] = resolved
+    return resolved
+
+
+def convert_stl_to_gcode(input_path, output_path, params, slicer_path, timeout=300):
     """
     Convert STL file to G-code using PrusaSlicer
 
@@ -29,18 +89,20 @@ def convert_stl_to_gcode(input_path, output_path, params, slicer_path):
         output_path: Path to output G-code file
         params: Dictionary containing slicing parameters
         slicer_path: Path to PrusaSlicer executable
+        timeout: Maximum slicing time in seconds
 
     Returns:
         tuple: (success: bool, error_message: str or None)
     """
     try:
         # Check if slicer exists
-        if not os.path.exists(slicer_path):
+        executable = resolve_slicer(slicer_path)
+        if executable is None:
             return False, f"No se encontró PrusaSlicer en: {slicer_path}"
 
         # Build PrusaSlicer command
         cmd = [
-            slicer_path,
+            executable,
             '--export-gcode',
             input_path,
             '--output', output_path,
@@ -57,17 +119,23 @@ def convert_stl_to_gcode(input_path, output_path, params, slicer_path):
         if params.get('support', False):
             cmd.extend(['--support-material'])
 
-        # Run PrusaSlicer
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-
-        if result.returncode != 0:
-            error_msg = result.stderr if result.stderr else "Error de laminado desconocido"
-            return False, f"Falló el laminado: {error_msg}"
+        # Run PrusaSlicer. The G-code goes to output_path (the CLI cannot write
+        # it to stdout); stdout only carries progress logs, so it is discarded.
+        # stderr goes to a temp file rather than a pipe: memory stays flat
+        # however much the slicer logs, and only its tail is read back
+        with tempfile.TemporaryFile() as stderr_file:
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_file,
+                timeout=timeout
+            )
+
+            if result.returncode != 0:
+                stderr_size = stderr_file.seek(0, os.SEEK_END)
+                stderr_file.seek(max(0, stderr_size - SLICER_STDERR_TAIL_BYTES))
+                error_msg = stderr_file.read().decode('utf-8', errors='replace').strip()
+                return False, f"Falló el laminado: {error_msg or 'Error de laminado desconocido'}"
 
         # Check if output file was created
         if not os.path.exists(output_path):
@@ -81,6 +149,85 @@ def convert_stl_to_gcode(input_path, output_path, params, slicer_path):
         return False, f"Error de laminado: {str(e)}"
 
 
+def slice_and_analyze(input_path, params, slicer_path, timeout=300):
+    """
+    Slice an STL file and extract filament usage from the resulting G-code.
+    Meant to run as a single job on a worker pool: the G-code is written
+    next to the STL and removed before returning, so callers only deal
+    with the STL file.
+
+    Args:
+        input_path: Path to input STL file
+        params: Dictionary containing slicing parameters
+        slicer_path: Path to PrusaSlicer executable
+        timeout: Maximum slicing time in seconds
+
+    Returns:
+        tuple: (filament_info: dict or None, error_message: str or None)
+    """
+    output_path = os.path.splitext(input_path)[0] + '.gcode'
+    try:
+        success, error = convert_stl_to_gcode(input_path, output_path, params, slicer_path, timeout)
+        if not success:
+            return None, error
+
+        filament_info = extract_filament_usage(output_path)
+        if 'error' in filament_info:
+            return None, filament_info['error']
+
+        return filament_info, None
+    finally:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+
+
+def _read_gcode_tail(gcode_path, size):
+    """
+    Read the last `size` bytes of a G-code file.
+
+    Returns:
+        tuple: (data: bytes, is_whole_file: bool)
+    """
+    with open(gcode_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - size))
+        return f.read(), end <= size
+
+
+def _parse_gcode_summary(content):
+    """
+    Parse PrusaSlicer summary comments from raw G-code (bytes or mmap)
+
+    Returns:
+        tuple: (filament_used_mm, filament_used_g, filament_used_cm3, estimated_time_seconds),
+               each None if not found
+    """
+    # First value of each field wins; stop as soon as all four are known
+    found = {}
+    for match in _RE_SUMMARY.finditer(content):
+        value = match['value']
+        field = (match['unit'] or match['alt_unit']).lower() if value is not None else b'time'
+        if field in found:
+            continue
+        if value is not None:
+            found[field] = float(value)
+        else:
+            hours, minutes, seconds = match.group('h', 'm', 's')
+            found[field] = int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)
+        if len(found) == 4:
+            break
+
+    filament_used_mm = found.get(b'mm')
+    filament_used_g = found.get(b'g')
+    filament_used_cm3 = found.get(b'cm3')
+    estimated_time_seconds = found.get(b'time')
+
+    return filament_used_mm, filament_used_g, filament_used_cm3, estimated_time_seconds
+
+
 def extract_filament_usage(gcode_path):
     """
     Extract filament usage and print time from G-code file
@@ -92,65 +239,17 @@ def extract_filament_usage(gcode_path):
         dict: Dictionary containing filament usage and time information
     """
     try:
-        filament_used_mm = None
-        filament_used_g = None
-        filament_used_cm3 = None
-        estimated_time_seconds = None
-
-        with open(gcode_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-
-            # Try different PrusaSlicer comment formats
-            # Format 1: ; filament used [mm] = 1234.56
-            mm_match = re.search(r';\s*filament\s+used\s*\[mm\]\s*=\s*([\d.]+)', content, re.IGNORECASE)
-            if mm_match:
-                filament_used_mm = float(mm_match.group(1))
-
-            # Format 2: ; filament used [g] = 12.34
-            g_match = re.search(r';\s*filament\s+used\s*\[g\]\s*=\s*([\d.]+)', content, re.IGNORECASE)
-            if g_match:
-                filament_used_g = float(g_match.group(1))
-
-            # Format 3: ; filament used [cm3] = 12.34
-            cm3_match = re.search(r';\s*filament\s+used\s*\[cm3\]\s*=\s*([\d.]+)', content, re.IGNORECASE)
-            if cm3_match:
-                filament_used_cm3 = float(cm3_match.group(1))
-
-            # Alternative format: ; filament_used_g = 12.34
-            if filament_used_g is None:
-                alt_g_match = re.search(r';\s*filament_used_g\s*=\s*([\d.]+)', content, re.IGNORECASE)
-                if alt_g_match:
-                    filament_used_g = float(alt_g_match.group(1))
-
-            # Alternative format: ; filament_used_mm = 1234.56
-            if filament_used_mm is None:
-                alt_mm_match = re.search(r';\s*filament_used_mm\s*=\s*([\d.]+)', content, re.IGNORECASE)
-                if alt_mm_match:
-                    filament_used_mm = float(alt_mm_match.group(1))
-
-            # Time parsing - multiple formats
-            # Format 1: ; estimated printing time (normal mode) = 1h 23m 45s
-            time_match = re.search(r';\s*estimated\s+printing\s+time.*?=\s*(.+?)(?:\n|$)', content, re.IGNORECASE)
-            if time_match:
-                time_str = time_match.group(1).strip()
-
-                hours = 0
-                minutes = 0
-                seconds = 0
-
-                hour_match = re.search(r'(\d+)\s*h', time_str, re.IGNORECASE)
-                if hour_match:
-                    hours = int(hour_match.group(1))
-
-                min_match = re.search(r'(\d+)\s*m(?:in)?', time_str, re.IGNORECASE)
-                if min_match:
-                    minutes = int(min_match.group(1))
-
-                sec_match = re.search(r'(\d+)\s*s', time_str, re.IGNORECASE)
-                if sec_match:
-                    seconds = int(sec_match.group(1))
-
-                estimated_time_seconds = hours * 3600 + minutes * 60 + seconds
+        # PrusaSlicer writes the summary comments at the end of the file, so
+        # only the tail is scanned; the full file is read only as a fallback
+        content, is_whole_file = _read_gcode_tail(gcode_path, GCODE_TAIL_BYTES)
+        summary = _parse_gcode_summary(content)
+        filament_missing = summary[:3] == (None, None, None)
+        if (filament_missing or summary[3] is None) and not is_whole_file:
+            # mapped, not read: the regexes page through the file without a copy of it
+            with open(gcode_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                summary = _parse_gcode_summary(mm)
+
+        filament_used_mm, filament_used_g, filament_used_cm3, estimated_time_seconds = summary
 
         # Validate we got the essential data
         if filament_used_mm is None and filament_used_cm3 is None:
@@ -163,9 +262,7 @@ def extract_filament_usage(gcode_path):
         # Convert cm3 to mm if needed
         if filament_used_mm is None and filament_used_cm3 is not None:
             # Convert cm3 to length: volume = π * r² * length
-            # r = 1.75/2 = 0.0875cm, length_cm = volume / (π * r²)
-            filament_radius_cm = 0.175 / 2
-            length_cm = filament_used_cm3 / (3.14159 * (filament_radius_cm ** 2))
+            length_cm = filament_used_cm3 / FILAMENT_CROSS_SECTION_CM2
             filament_used_mm = length_cm * 10  # cm to mm
 
         if filament_used_mm is None:
@@ -175,13 +272,12 @@ def extract_filament_usage(gcode_path):
         if filament_used_g is None:
             if filament_used_cm3 is not None:
                 # Use cm3 directly with PLA density
-                filament_used_g = filament_used_cm3 * 1.24
+                filament_used_g = filament_used_cm3 * PLA_DENSITY_G_CM3
             else:
                 # Calculate from length
                 # Volume = π * r² * length
-                filament_radius_cm = 0.175 / 2  # 1.75mm diameter
-                volume_cm3 = 3.14159 * (filament_radius_cm ** 2) * (filament_used_mm / 10)
-                filament_used_g = volume_cm3 * 1.24  # PLA density
+                volume_cm3 = FILAMENT_CROSS_SECTION_CM2 * (filament_used_mm / 10)
+                filament_used_g = volume_cm3 * PLA_DENSITY_G_CM3
 
         return {
             'filament_length_mm': round(filament_used_mm, 2),
@@ -207,15 +303,22 @@ def estimate_filament_from_extrusion(gcode_path):
     """
     try:
         total_extrusion = 0
-        with open(gcode_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                if line.startswith('G1') and 'E' in line:
-                    # Extract E value
-                    e_match = re.search(r'E([\d.]+)', line)
-                    if e_match:
-                        e_val = float(e_match.group(1))
-                        if e_val > total_extrusion:
-                            total_extrusion = e_val
+        with open(gcode_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            first = _RE_G1_E_FIRST.match(mm)
+            if first:
+                total_extrusion = float(first[1])
+            # findall per window: matching and the float()/max() passes run in C,
+            # and only one window's worth of matches is alive at a time
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = mm.find(b'\n', min(start + GCODE_SCAN_WINDOW, size))
+                if end == -1:
+                    end = size
+                values = _RE_G1_E_LINE.findall(mm, start, end)
+                if values:
+                    total_extrusion = max(total_extrusion, max(map(float, values)))
+                start = end
         return total_extrusion if total_extrusion > 0 else 1000
     except:
         return 1000